@@ -0,0 +1,93 @@
+"""Availability search benchmark: the SQL path versus the in-memory availability index.
+
+Seeds a scratch database, then times "free slot on <day> between <start>
+and <end> under <price>/hr" for one city and for all cities, on both paths.
+The index is also timed cold (entry built on the request) and after a
+booking, which refreshes just that turf.
+
+    python benchmarks/bench_availability_search.py --turfs 10000 --slots 2000000
+"""
+import argparse
+import time
+from datetime import date, time as clock, timedelta
+
+from common import make_app, percentile, remove_database
+from turf_app import db
+from turf_app.bookings import claim_slot
+from turf_app.models import Slot, User
+from turf_app.seed import seed_database
+from turf_app.slotsearch import availability_index, find_available
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def ms(seconds):
+    return f'{seconds * 1000:8.2f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turfs', type=int, default=10000)
+    parser.add_argument('--slots', type=int, default=2000000)
+    parser.add_argument('--bookings', type=int, default=400000)
+    parser.add_argument('--city', default='Pune')
+    parser.add_argument('--start', default='18:00')
+    parser.add_argument('--end', default='20:00')
+    parser.add_argument('--max-price', type=float, default=1200)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app, db_path = make_app()
+    try:
+        with app.app_context():
+            started = time.perf_counter()
+            seed_database(users=max(200, args.turfs // 3), owners=max(20, args.turfs // 50), turfs=args.turfs,
+                          slots=args.slots, bookings=args.bookings, batch=20000)
+            print(f'seeded {args.turfs:,} turfs / {args.slots:,} slots in {time.perf_counter() - started:.1f}s')
+
+            day = date.today() + timedelta(days=1)
+            start, end = clock.fromisoformat(args.start), clock.fromisoformat(args.end)
+            player = db.session.query(User.id).filter(User.is_owner.is_(False)).limit(1).scalar()
+
+            print(f'{"search":<26} {"p50 ms":>8} {"p95 ms":>8} {"max ms":>8}')
+            for city in (args.city, ''):
+                label = city or 'all cities'
+
+                def search(use_index):
+                    return find_available(city, day, start, end, args.max_price, use_index=use_index)
+
+                def report(name, samples):
+                    print(f'{name:<26} {ms(percentile(samples, 50))} {ms(percentile(samples, 95))} '
+                          f'{ms(max(samples))}')
+
+                report(f'{label} sql', timed(lambda: search(False), args.repeat))
+                availability_index.clear()
+                report(f'{label} index cold', timed(lambda: search(True), 1))
+                report(f'{label} index warm', timed(lambda: search(True), args.repeat))
+
+                def book_then_search():
+                    page = search(True)
+                    slot = page.results[0].slots[0] if page.results else None
+                    if slot is not None:
+                        claim_slot(slot.id, player)  # marks the turf dirty in every entry
+                    search(True)
+                report(f'{label} index +booking', timed(book_then_search, min(args.repeat, 20)))
+
+                if [r.turf.id for r in search(False).results] != [r.turf.id for r in search(True).results]:
+                    raise SystemExit(f'{label}: index and SQL rankings differ')
+            print('index and SQL rankings agree')
+            print(f'free slots left on {day}: '
+                  f'{Slot.query.filter(Slot.date == day, Slot.is_booked.is_(False)).count():,}')
+    finally:
+        remove_database(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Contention benchmark for the booking engine.
+
+Fires N concurrent bookers at a single slot, once per round, and reports
+throughput and latency. Exactly one booker must win each round.
+
+    python benchmarks/bench_booking_contention.py --threads 32 --rounds 20
+"""
+import argparse
+import threading
+import time
+from datetime import date, time as dtime
+
+from common import make_app, percentile, remove_database
+from turf_app import db
+from turf_app.bookings import claim_slot, release_booking
+from turf_app.models import User, Turf, Slot, Booking
+
+
+def seed(app, threads, rounds):
+    with app.app_context():
+        owner = User(username='bench-owner', email='owner@bench.local', is_owner=True, password_hash='x')
+        db.session.add(owner)
+        db.session.flush()
+        turf = Turf(owner_id=owner.id, name='Bench Turf', city='Pune', price_per_hour=1000.0)
+        db.session.add(turf)
+        db.session.flush()
+        players = [
+            User(username=f'player{i}', email=f'player{i}@bench.local', password_hash='x')
+            for i in range(threads)
+        ]
+        slots = [
+            Slot(turf_id=turf.id, date=date(2030, 1, 1 + r % 28), start_time=dtime(18), end_time=dtime(19))
+            for r in range(rounds)
+        ]
+        db.session.add_all(players + slots)
+        db.session.commit()
+        return [p.id for p in players], [s.id for s in slots]
+
+
+def run_round(app, slot_id, user_ids):
+    barrier = threading.Barrier(len(user_ids))
+    latencies = []
+    winners = []
+    lock = threading.Lock()
+
+    def booker(user_id):
+        with app.app_context():
+            barrier.wait()
+            started = time.perf_counter()
+            booking = claim_slot(slot_id, user_id)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if booking is not None:
+                    winners.append(user_id)
+            db.session.remove()
+
+    workers = [threading.Thread(target=booker, args=(uid,)) for uid in user_ids]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return latencies, winners
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16, help='concurrent bookers per slot')
+    parser.add_argument('--rounds', type=int, default=10, help='number of slots to fight over')
+    args = parser.parse_args()
+
+    app, db_path = make_app()
+    try:
+        user_ids, slot_ids = seed(app, args.threads, args.rounds)
+
+        latencies = []
+        started = time.perf_counter()
+        for slot_id in slot_ids:
+            round_latencies, winners = run_round(app, slot_id, user_ids)
+            latencies.extend(round_latencies)
+            if len(winners) != 1:
+                raise SystemExit(f'slot {slot_id}: expected 1 winner, got {len(winners)}')
+        wall = time.perf_counter() - started
+
+        # A cancelled slot must be bookable again through the same path.
+        with app.app_context():
+            booking = Booking.query.filter_by(slot_id=slot_ids[0], status='confirmed').one()
+            assert release_booking(booking.id)
+            assert claim_slot(slot_ids[0], user_ids[0]) is not None
+
+        attempts = len(latencies)
+        print(f'bookers/slot : {args.threads}')
+        print(f'slots        : {args.rounds}')
+        print(f'attempts     : {attempts}')
+        print(f'throughput   : {attempts / wall:.1f} attempts/s')
+        print(f'p50 latency  : {percentile(latencies, 50) * 1000:.2f} ms')
+        print(f'p99 latency  : {percentile(latencies, 99) * 1000:.2f} ms')
+        print('double bookings: 0')
+    finally:
+        remove_database(db_path)
+
+
+if __name__ == '__main__':
+    main()
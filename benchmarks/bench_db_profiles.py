@@ -0,0 +1,134 @@
+"""Database profile benchmark: mixed read/write throughput under each DB_PROFILE.
+
+For each profile, seeds a scratch database and runs worker processes
+against it for a fixed time, each with its own app and engine as under a
+multi-worker server. Every operation is either a read (a turf's free
+slots for the week) or a write (booking a free slot and cancelling it
+again). Reports operations per second, read and write latency and how
+many operations failed with "database is locked".
+
+The postgres profile runs only with --postgres-url pointing at a
+throwaway database (it is seeded) and a PostgreSQL driver installed.
+
+    python benchmarks/bench_db_profiles.py --workers 8 --seconds 10 --write-ratio 0.2
+"""
+import argparse
+import multiprocessing
+import random
+import time
+from datetime import date
+
+from common import make_app, percentile, remove_database, scratch_path
+from sqlalchemy.exc import OperationalError
+from turf_app import db
+from turf_app.availability import free_slots_by_day
+from turf_app.bookings import claim_slot, release_booking
+from turf_app.models import Turf, Slot, User
+from turf_app.seed import seed_database
+
+
+def worker(index, db_path, overrides, turf_ids, slot_ids, user_id, seconds, write_ratio):
+    """One worker process: mixed operations until the deadline; returns (reads, writes, locked)."""
+    app, _ = make_app(db_path, SCHEMA_AUTO_UPGRADE=False, **overrides)
+    rng = random.Random(index)
+    reads, writes, locked = [], [], 0
+    with app.app_context():
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            write = rng.random() < write_ratio
+            started = time.perf_counter()
+            try:
+                if write:
+                    booking = claim_slot(rng.choice(slot_ids), user_id)
+                    if booking is not None:
+                        release_booking(booking.id)
+                else:
+                    free_slots_by_day(rng.choice(turf_ids))
+            except OperationalError as exc:
+                db.session.rollback()
+                if 'locked' not in str(exc):
+                    raise
+                locked += 1
+                continue
+            (writes if write else reads).append(time.perf_counter() - started)
+            db.session.remove()
+    return reads, writes, locked
+
+
+def seed(app, turfs, slots):
+    with app.app_context():
+        seed_database(users=220, owners=20, turfs=turfs, slots=slots, bookings=0, batch=20000)
+        turf_ids = [turf_id for turf_id, in db.session.query(Turf.id)]
+        user_id = db.session.query(User.id).filter(User.is_owner.is_(False)).limit(1).scalar()
+        slot_ids = [slot_id for slot_id, in db.session.query(Slot.id).filter(
+            Slot.is_booked.is_(False), Slot.date > date.today())]
+        return turf_ids, slot_ids, user_id
+
+
+def run_profile(name, db_path, overrides, args):
+    app, _ = make_app(db_path, **overrides)
+    turf_ids, slot_ids, user_id = seed(app, args.turfs, args.slots)
+    with app.app_context():
+        active = app.config['DB_PROFILE_ACTIVE']
+        db.engine.dispose()
+    # Each worker books from its own share of the slots, as different players
+    # book different slots; contention is on the database, not the rows.
+    shares = [slot_ids[i::args.workers] for i in range(args.workers)]
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(args.workers) as pool:
+        started = time.perf_counter()
+        results = pool.starmap(worker, [
+            (i, db_path, overrides, turf_ids, shares[i], user_id, args.seconds, args.write_ratio)
+            for i in range(args.workers)
+        ])
+        wall = time.perf_counter() - started
+    reads = [s for r, _, _ in results for s in r]
+    writes = [s for _, w, _ in results for s in w]
+    locked = sum(n for _, _, n in results)
+    print(f'{name:<13} {active:<13} {(len(reads) + len(writes)) / wall:>8.1f} '
+          f'{percentile(reads, 50) * 1000:>8.2f} {percentile(reads, 95) * 1000:>8.2f} '
+          f'{percentile(writes, 50) * 1000:>8.2f} {percentile(writes, 95) * 1000:>8.2f} {locked:>7}')
+
+
+def postgres_available():
+    for driver in ('psycopg2', 'psycopg'):
+        try:
+            __import__(driver)
+            return True
+        except ImportError:
+            pass
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--turfs', type=int, default=500)
+    parser.add_argument('--slots', type=int, default=100000)
+    parser.add_argument('--postgres-url', help='throwaway PostgreSQL database for the postgres profile')
+    args = parser.parse_args()
+
+    print(f'{args.workers} workers, {args.seconds:g} s, {args.write_ratio:.0%} writes')
+    print(f'{"profile":<13} {"active":<13} {"ops/s":>8} {"read p50":>8} {"read p95":>8} '
+          f'{"write p50":>8} {"write p95":>8} {"locked":>7}')
+    runs = [(profile, {'DB_PROFILE': profile}) for profile in ('default', 'sqlite-tuned')]
+    if not args.postgres_url:
+        print('postgres      skipped (no --postgres-url)')
+    elif not postgres_available():
+        print('postgres      skipped (no PostgreSQL driver installed)')
+    else:
+        runs.append(('postgres', {'DB_PROFILE': 'postgres', 'SQLALCHEMY_DATABASE_URI': args.postgres_url}))
+
+    for name, overrides in runs:
+        # A new file per profile: WAL mode, once set, stays with the database.
+        db_path = scratch_path()
+        try:
+            run_profile(name, db_path, overrides, args)
+        finally:
+            remove_database(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""Endpoint load benchmark: the main routes through the Flask test client.
+
+Seeds a scratch database (or uses one seeded with `flask seed`), then
+drives each endpoint single- and multi-threaded and reports throughput,
+p50/p95/p99 latency and SQL statements per request as JSON. Every page
+and form is covered except add-schedule, the deletes and the file import. Pass
+--baseline to compare against an earlier --output; the run fails if any
+endpoint's p95 regresses by more than --tolerance.
+
+    python benchmarks/bench_endpoints.py --requests 200 --threads 1 4 --output run.json
+    python benchmarks/bench_endpoints.py --baseline run.json
+"""
+import argparse
+import itertools
+import json
+import platform
+import threading
+import time
+from datetime import date, timedelta
+
+from common import make_app, percentile, remove_database
+from turf_app import db
+from turf_app.models import Booking, Slot, Turf, User
+from turf_app.seed import SEED_PASSWORD, seed_database
+
+
+def endpoints(sample):
+    """name -> (method, path factory, login as, form factory); factories take the request number."""
+    turf, day = sample['turf_id'], sample['date']
+    free_slots, bookings, new_slots = sample['free_slots'], sample['bookings'], sample['new_slots']
+    turf_form = {'name': f'Turf {turf}', 'city': 'Pune', 'address': f'{turf} Main Road', 'price': '1000'}
+    return {
+        'index': ('GET', lambda i: '/', None, None),
+        'turf_list': ('GET', lambda i: '/turfs', None, None),
+        'turf_list?city': ('GET', lambda i: '/turfs?city=Pune', None, None),
+        'turf_list?q': ('GET', lambda i: '/turfs?q=turf', None, None),
+        'available_turfs': ('GET', lambda i: f'/turfs/available?city=Pune&date={day}&start=18:00&max_price=1200',
+                            None, None),
+        'nearby_turfs': ('GET', lambda i: '/turfs/nearby?lat=18.52&lng=73.85&radius_km=5', None, None),
+        'turf_details': ('GET', lambda i: f'/turf/{turf}', None, None),
+        'turf_availability': ('GET', lambda i: f'/turf/{turf}/availability?start={day}', None, None),
+        'booking_history': ('GET', lambda i: '/my-bookings', 'player', None),
+        'book_slot': ('POST', lambda i: f'/book/{next(free_slots)}', 'player', None),
+        # Cancels the player's bookings, those book_slot just made included.
+        'cancel_booking': ('POST', lambda i: f'/cancel-booking/{next(bookings)}', 'player', None),
+        'owner_dashboard': ('GET', lambda i: '/owner/dashboard', 'owner', None),
+        'owner_reports': ('GET', lambda i: '/owner/reports', 'owner', None),
+        'export_bookings': ('GET', lambda i: '/owner/bookings/export?format=csv', 'owner', None),
+        'add_turf': ('POST', lambda i: '/owner/add-turf', 'owner', lambda i: dict(turf_form, name=f'Bench {i}')),
+        'edit_turf': ('POST', lambda i: f'/owner/turf/{turf}/edit', 'owner', lambda i: turf_form),
+        # One new hour per request, before the seeded 06:00 start and past the seeded days.
+        'add_slot': ('POST', lambda i: f'/owner/turf/{turf}/add-slot', 'owner', lambda i: {
+            'date': (day + timedelta(days=1000 + next(new_slots))).isoformat(),
+            'start_time': '05:00', 'end_time': '06:00'}),
+    }
+
+
+def confirmed_bookings(app, user_id):
+    """A user's confirmed booking ids, read when first needed."""
+    with app.app_context():
+        ids = [bid for (bid,) in db.session.query(Booking.id).filter(
+            Booking.user_id == user_id, Booking.status == 'confirmed').order_by(Booking.id)]
+    yield from ids
+
+
+def pick_sample(app):
+    """Ids to drive the routes with: the busiest owner, a player and a turf with free slots."""
+    with app.app_context():
+        owner = db.session.query(Turf.owner_id).group_by(Turf.owner_id) \
+            .order_by(db.func.count().desc()).limit(1).scalar()
+        player = db.session.query(User.id).filter(User.is_owner.is_(False)).order_by(User.id).limit(1).scalar()
+        turf = db.session.query(Turf.id).filter(Turf.owner_id == owner).order_by(Turf.id).limit(1).scalar()
+        free = [sid for (sid,) in db.session.query(Slot.id).filter(
+            Slot.is_booked.is_(False), Slot.date >= date.today() + timedelta(days=1)
+        ).order_by(Slot.id).limit(100000)]
+        names = dict(db.session.query(User.id, User.username).filter(User.id.in_([owner, player])))
+    return {
+        'owner': names[owner], 'player': names[player], 'turf_id': turf,
+        'date': date.today(), 'free_slots': iter(free),
+        'bookings': confirmed_bookings(app, player), 'new_slots': itertools.count(),
+    }
+
+
+def login(client, username):
+    response = client.post('/auth/login', data={'username': username, 'password': SEED_PASSWORD})
+    assert response.status_code == 302, f'login failed for {username}'
+
+
+def run_endpoint(app, sample, method, path, who, form, requests, threads):
+    latencies, statements, errors = [], [], []
+    lock = threading.Lock()
+    counter = iter(range(requests))
+    ready = threading.Barrier(threads + 1)  # log in first, then start the clock
+
+    def worker():
+        client = app.test_client()
+        if who:
+            login(client, sample[who])
+        ready.wait()
+        while True:
+            with lock:
+                i = next(counter, None)
+                if i is None:
+                    return
+                url = path(i)
+                data = form(i) if form else None
+            started = time.perf_counter()
+            response = client.open(url, method=method, data=data)
+            response.get_data()  # streamed bodies (the export) are produced while read
+            response.close()
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statements.append(int(response.headers.get('X-SQL-Queries', 0)))
+                if response.status_code >= 400:
+                    errors.append(response.status_code)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    ready.wait()
+    started = time.perf_counter()
+    for w in workers:
+        w.join()
+    wall = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'throughput_rps': round(len(latencies) / wall, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'sql_p50': percentile(statements, 50),
+        'sql_max': max(statements, default=0),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return the list of (endpoint, threads, old p95, new p95) that regressed."""
+    regressions = []
+    for name, runs in results.items():
+        for threads, stats in runs.items():
+            old = baseline.get('results', {}).get(name, {}).get(threads)
+            if old and stats['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+                regressions.append((name, threads, old['p95_ms'], stats['p95_ms']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', help='existing seeded SQLite file (default: seed a scratch one)')
+    parser.add_argument('--turfs', type=int, default=1000, help='turfs to seed in the scratch database')
+    parser.add_argument('--slots', type=int, default=100000, help='slots to seed in the scratch database')
+    parser.add_argument('--bookings', type=int, default=20000, help='bookings to seed in the scratch database')
+    parser.add_argument('--requests', type=int, default=200, help='requests per endpoint and thread count')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4], help='thread counts to run')
+    parser.add_argument('--only', nargs='+', help='endpoints to run (default: all)')
+    parser.add_argument('--page-cache', action='store_true', help='leave the anonymous page cache on')
+    parser.add_argument('--output', help='write the JSON report here as well as to stdout')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 regression (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    app, db_path = make_app(args.db, PAGE_CACHE_ENABLED=args.page_cache, SQL_COUNT_QUERIES=True,
+                            SQL_QUERY_BUDGET_RAISE=False)
+    try:
+        if not args.db:
+            with app.app_context():
+                seed_database(users=max(200, args.turfs // 2), owners=max(20, args.turfs // 20),
+                              turfs=args.turfs, slots=args.slots, bookings=args.bookings)
+        sample = pick_sample(app)
+
+        results = {}
+        for name, (method, path, who, form) in endpoints(sample).items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = {
+                str(threads): run_endpoint(app, sample, method, path, who, form, args.requests, threads)
+                for threads in args.threads
+            }
+            print(f'{name:<18} ' + '  '.join(
+                f'{t}t: {r["throughput_rps"]:>7} rps p95 {r["p95_ms"]:>7} ms sql {r["sql_p50"]}'
+                for t, r in results[name].items()), flush=True)
+
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'database': 'seeded' if args.db else f'scratch ({args.turfs} turfs, {args.slots} slots)',
+                'requests': args.requests,
+                'page_cache': args.page_cache,
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            },
+            'results': results,
+        }
+        print(json.dumps(report, indent=2))
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+
+        if args.baseline:
+            with open(args.baseline) as f:
+                regressions = compare(results, json.load(f), args.tolerance)
+            for name, threads, old, new in regressions:
+                print(f'REGRESSION {name} ({threads} threads): p95 {old} ms -> {new} ms')
+            if regressions:
+                raise SystemExit(1)
+            print('No p95 regressions against the baseline.')
+    finally:
+        if not args.db:
+            remove_database(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Logging cost on the request thread: synchronous FileHandler vs the queue pipeline.
+
+Logs N records from each of T threads inside a request context and
+reports the per-call latency seen by the caller, plus how many records
+the bounded queue dropped.
+
+    python benchmarks/bench_logging.py --threads 8 --records 5000
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from common import make_app, percentile, remove_database
+from turf_app.logs import JsonFormatter, dropped_records
+
+
+def run(app, logger, threads, records):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        samples = []
+        with app.test_request_context('/turf/1'):
+            for i in range(records):
+                started = time.perf_counter()
+                logger.info('booking %s claimed', i)
+                samples.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(samples)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return latencies, time.perf_counter() - started
+
+
+def report(label, latencies, wall):
+    print(f'{label}:')
+    print(f'  calls       : {len(latencies)} in {wall:.2f} s')
+    print(f'  p50 per call: {percentile(latencies, 50) * 1e6:8.1f} us')
+    print(f'  p99 per call: {percentile(latencies, 99) * 1e6:8.1f} us')
+    print(f'  max per call: {max(latencies) * 1e6:8.1f} us')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8, help='concurrent logging threads')
+    parser.add_argument('--records', type=int, default=5000, help='records per thread')
+    args = parser.parse_args()
+
+    log_dir = tempfile.mkdtemp(prefix='turfease-logs-')
+    app, db_path = make_app(LOG_FILE=os.path.join(log_dir, 'queued.log'))
+    try:
+        # Baseline: the old setup, a FileHandler writing on the calling thread.
+        sync_logger = logging.getLogger('bench.sync')
+        sync_logger.propagate = False
+        sync_logger.setLevel(logging.INFO)
+        handler = logging.FileHandler(os.path.join(log_dir, 'sync.log'))
+        handler.setFormatter(JsonFormatter())
+        sync_logger.addHandler(handler)
+        report('synchronous FileHandler', *run(app, sync_logger, args.threads, args.records))
+        handler.close()
+
+        report('queue pipeline', *run(app, app.logger, args.threads, args.records))
+        print(f'  dropped     : {dropped_records()}')
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+        remove_database(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Nearby search benchmark: the R*Tree with haversine refinement versus a brute-force scan.
+
+For each turf count, seeds a scratch database (turfs spread around the
+seeded cities' centres) and times a radius search and a k-nearest search
+from random points in those cities, through geo.py and by loading every
+located turf and computing its distance. Both paths must return the same
+turfs in the same order.
+
+    python benchmarks/bench_nearby.py --sizes 1000 10000 100000
+"""
+import argparse
+import random
+import time
+
+from common import make_app, percentile, remove_database
+from turf_app import db
+from turf_app.geo import haversine_km, nearest_turfs, turfs_within
+from turf_app.models import Turf
+from turf_app.seed import CITY_CENTERS, CITY_SPREAD, seed_database
+
+
+def brute_force(lat, lng, radius_km=None, k=None):
+    """Distance to every located live turf, then filter and sort: what the index avoids."""
+    rows = (db.session.query(Turf.id, Turf.latitude, Turf.longitude)
+            .filter(Turf.deleted_at.is_(None), Turf.latitude.isnot(None)))
+    ranked = sorted((haversine_km(lat, lng, t_lat, t_lng), turf_id) for turf_id, t_lat, t_lng in rows)
+    if radius_km is not None:
+        ranked = [(d, turf_id) for d, turf_id in ranked if d <= radius_km]
+    return [turf_id for _, turf_id in ranked[:k]]
+
+
+def timed(fn, points):
+    samples = []
+    for lat, lng in points:
+        started = time.perf_counter()
+        fn(lat, lng)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def ms(seconds):
+    return f'{seconds * 1000:8.2f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--radius-km', type=float, default=5.0)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    points = [(lat + rng.uniform(-CITY_SPREAD, CITY_SPREAD), lng + rng.uniform(-CITY_SPREAD, CITY_SPREAD))
+              for lat, lng in (rng.choice(list(CITY_CENTERS.values())) for _ in range(args.repeat))]
+
+    print(f'{"turfs":>8} {"search":<18} {"p50 ms":>8} {"p95 ms":>8} {"results":>8}')
+    for size in args.sizes:
+        app, db_path = make_app()
+        try:
+            with app.app_context():
+                seed_database(users=max(200, size // 50 + 1), owners=max(20, size // 50), turfs=size,
+                              slots=size, bookings=0, batch=20000)
+                searches = {
+                    'radius index': lambda lat, lng: [r.turf.id for r in
+                                                      turfs_within(lat, lng, args.radius_km, limit=size)],
+                    'radius brute': lambda lat, lng: brute_force(lat, lng, radius_km=args.radius_km),
+                    f'{args.k}-nearest index': lambda lat, lng: [r.turf.id for r in
+                                                                  nearest_turfs(lat, lng, args.k)],
+                    f'{args.k}-nearest brute': lambda lat, lng: brute_force(lat, lng, k=args.k),
+                }
+                for name, search in searches.items():
+                    samples = timed(search, points)
+                    found = sum(len(search(lat, lng)) for lat, lng in points) / len(points)
+                    print(f'{size:>8,} {name:<18} {ms(percentile(samples, 50))} {ms(percentile(samples, 95))} '
+                          f'{found:8.1f}')
+                for lat, lng in points:
+                    if searches['radius index'](lat, lng) != searches['radius brute'](lat, lng):
+                        raise SystemExit(f'{size}: radius results differ at ({lat}, {lng})')
+                    if searches[f'{args.k}-nearest index'](lat, lng) != searches[f'{args.k}-nearest brute'](lat, lng):
+                        raise SystemExit(f'{size}: nearest results differ at ({lat}, {lng})')
+        finally:
+            remove_database(db_path)
+    print('index and brute-force results agree')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Owner report benchmark: reading the turf/day rollups versus aggregating slots on the fly.
+
+For each slot volume, seeds a scratch database, rebuilds the rollups and
+times an owner's daily report (time series plus hour heatmap) over the
+last 30 seeded days and over the whole seeded range, both ways, plus a
+booking and its cancellation, which now also update the rollups. The two
+reports must agree.
+
+    python benchmarks/bench_reports.py --slots 100000 1000000 --turfs 500
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from common import make_app, percentile, remove_database
+from sqlalchemy import case, func
+from turf_app import db
+from turf_app.analytics import hours_between
+from turf_app.bookings import claim_slot, release_booking
+from turf_app.models import Turf, Slot, User
+from turf_app.rollups import rebuild_rollups, rollup_report, start_hour
+from turf_app.seed import seed_database
+
+
+def scan_report(owner_id, start, end):
+    """The same (day, hour) figures straight from the slots, as reports would without rollups."""
+    booked = case((Slot.is_booked, 1), else_=0)
+    return (
+        db.session.query(Slot.date, start_hour(Slot.start_time), func.count(), func.sum(booked),
+                         func.sum(booked * hours_between(Slot.start_time, Slot.end_time) * Turf.price_per_hour))
+        .join(Turf, Turf.id == Slot.turf_id)
+        .filter(Turf.owner_id == owner_id, Turf.deleted_at.is_(None), Slot.date.between(start, end))
+        .group_by(Slot.date, start_hour(Slot.start_time))
+        .all()
+    )
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def ms(seconds):
+    return f'{seconds * 1000:8.2f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--slots', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--turfs', type=int, default=500)
+    parser.add_argument('--owners', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f'{"slots":>10} {"bookings":>10} {"path":<16} {"p50 ms":>8} {"p95 ms":>8}')
+    for slots in args.slots:
+        app, db_path = make_app()
+        try:
+            with app.app_context():
+                seed_database(users=args.owners + 200, owners=args.owners, turfs=args.turfs, slots=slots,
+                              bookings=slots // 5, batch=20000)
+                rebuild = rebuild_rollups()
+                owner_id = (db.session.query(Turf.owner_id).group_by(Turf.owner_id)
+                            .order_by(func.count().desc()).limit(1).scalar())
+                start, end = db.session.query(func.min(Slot.date), func.max(Slot.date)).one()
+                player = db.session.query(User.id).filter(User.is_owner.is_(False)).limit(1).scalar()
+
+                def report(name, samples):
+                    print(f'{slots:>10,} {slots // 5:>10,} {name:<16} {ms(percentile(samples, 50))} '
+                          f'{ms(percentile(samples, 95))}')
+
+                recent = end - timedelta(days=29)
+                report('rollup rebuild', [rebuild.seconds])
+                report('30d rollups', timed(lambda: rollup_report(owner_id, recent, end), args.repeat))
+                report('30d scan', timed(lambda: scan_report(owner_id, recent, end), args.repeat))
+                report('all rollups', timed(lambda: rollup_report(owner_id, start, end), args.repeat))
+                report('all scan', timed(lambda: scan_report(owner_id, start, end), args.repeat))
+
+                free = (db.session.query(Slot.id).filter(Slot.is_booked.is_(False), Slot.date > date.today())
+                        .limit(args.repeat).all())
+
+                def book_and_release():
+                    slot_id = free.pop()[0]
+                    booking = claim_slot(slot_id, player)
+                    release_booking(booking.id)
+                report('book+cancel', timed(book_and_release, min(args.repeat, len(free))))
+
+                series = rollup_report(owner_id, start, end).series
+                scanned = {}
+                for day, _, _, bookings, revenue in scan_report(owner_id, start, end):
+                    totals = scanned.setdefault(day, [0, 0.0])
+                    totals[0] += bookings
+                    totals[1] += revenue or 0.0
+                for point in series:
+                    bookings, revenue = scanned.get(point.period, [0, 0.0])
+                    if point.bookings != bookings or abs(point.revenue - round(revenue, 2)) > 0.01:
+                        raise SystemExit(f'{slots}: rollup and scan reports differ on {point.period}')
+                assert series[-1].period - series[0].period == timedelta(days=(end - start).days)
+        finally:
+            remove_database(db_path)
+    print('rollup and scan reports agree')
+
+
+if __name__ == '__main__':
+    main()
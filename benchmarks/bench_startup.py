@@ -0,0 +1,86 @@
+"""Startup benchmark: create_app() and first-request latency in fresh processes.
+
+Each run starts a new interpreter against an already-upgraded scratch
+database, so it measures what a new worker pays: importing the app, the
+create_app() factory (a single schema version check) and the first
+request, which compiles templates unless the Jinja bytecode cache is warm.
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def child(db_path, cache_dir):
+    """Runs inside the fresh interpreter; prints one JSON line of timings."""
+    started = time.perf_counter()
+    from common import make_app  # imports the app package
+    imported = time.perf_counter()
+    app, _ = make_app(db_path, JINJA_CACHE_DIR=cache_dir, PAGE_CACHE_ENABLED=False)
+    created = time.perf_counter()
+    client = app.test_client()
+    response = client.get('/')
+    first = time.perf_counter()
+    assert response.status_code == 200, response.status_code
+    client.get('/')
+    second = time.perf_counter()
+    print(json.dumps({
+        'import': imported - started,
+        'create_app': created - imported,
+        'first_request': first - created,
+        'second_request': second - first,
+    }))
+
+
+def spawn(db_path, cache_dir):
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', db_path, cache_dir],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(label, runs):
+    from common import percentile
+    print(f'{label}:')
+    for key in ('import', 'create_app', 'first_request', 'second_request'):
+        samples = [r[key] for r in runs]
+        print(f'  {key:<15}: p50 {percentile(samples, 50) * 1000:7.1f} ms   '
+              f'max {max(samples) * 1000:7.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes per scenario')
+    parser.add_argument('--child', nargs=2, metavar=('DB', 'CACHE_DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(*args.child)
+
+    from common import make_app, remove_database
+    app, db_path = make_app()  # upgrade the scratch schema once, up front
+    del app
+    cache_dir = tempfile.mkdtemp(prefix='turfease-jinja-')
+    try:
+        cold = []
+        for _ in range(args.runs):
+            shutil.rmtree(cache_dir)
+            os.makedirs(cache_dir)
+            cold.append(spawn(db_path, cache_dir))
+        warm = [spawn(db_path, cache_dir) for _ in range(args.runs)]
+
+        report('cold template cache', cold)
+        report('warm template cache', warm)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        remove_database(db_path)
+
+
+if __name__ == '__main__':
+    main()
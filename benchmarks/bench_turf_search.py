@@ -0,0 +1,94 @@
+"""Turf search benchmark: FTS5 search versus the old leading-wildcard ilike scan.
+
+    python benchmarks/bench_turf_search.py --sizes 1000 10000 100000
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from common import make_app, percentile, remove_database
+from turf_app import db
+from turf_app.models import User, Turf
+from turf_app.search import search_turfs
+
+SYLLABLES = ['ka', 'ra', 'mi', 'to', 'shi', 'van', 'pur', 'na', 'gar', 'dev', 'lo', 'su', 'bha', 'ti', 'kon']
+
+
+def vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def seed(count, batch=10000):
+    """Insert `count` turfs with realistic spread: ~300 cities, a few thousand distinct words."""
+    rng = random.Random(7)
+    words = vocabulary(rng, 3000)
+    cities = [w.title() for w in vocabulary(rng, 300)]
+    now = datetime.utcnow()
+    owner = User(username='bench-owner', email='owner@bench.local', is_owner=True, password_hash='x')
+    db.session.add(owner)
+    db.session.flush()
+    rows = []
+    for i in range(count):
+        city = rng.choice(cities)
+        rows.append(dict(
+            owner_id=owner.id,
+            name=f'{rng.choice(words).title()} {rng.choice(words).title()} Arena',
+            city=city,
+            address=f'{i} {rng.choice(words).title()} Road, {city}',
+            description=' '.join(rng.choice(words) for _ in range(12)),
+            price_per_hour=rng.choice([600.0, 800.0, 1000.0]),
+            created_at=now, updated_at=now,
+        ))
+        if len(rows) == batch:
+            db.session.execute(insert(Turf), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(Turf), rows)
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f'{"turfs":>8} {"fts p50 ms":>11} {"fts p99 ms":>11} {"ilike p50 ms":>13} {"ilike p99 ms":>13}')
+    for size in args.sizes:
+        app, db_path = make_app()
+        try:
+            with app.app_context():
+                seed(size)
+                rng = random.Random(size)
+                sample = [t for t in Turf.query.order_by(db.func.random()).limit(10)]
+                queries = [t.city[:4] for t in sample[:3]] + [t.name.split()[0] for t in sample[3:6]]
+                queries += [f'{t.name.split()[1][:3]} {t.city}' for t in sample[6:]]
+                rng.shuffle(queries)
+                fts, scan = [], []
+                for q in queries:
+                    fts += timed(lambda: search_turfs(q, page=1), args.repeat)
+                    scan += timed(lambda: Turf.query.filter(Turf.city.ilike(f'%{q}%')).limit(13).all(), args.repeat)
+                db.session.remove()
+            print(f'{size:>8} {percentile(fts, 50) * 1000:>11.2f} {percentile(fts, 99) * 1000:>11.2f}'
+                  f' {percentile(scan, 50) * 1000:>13.2f} {percentile(scan, 99) * 1000:>13.2f}')
+        finally:
+            remove_database(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Upgrade benchmark: a database from before schema versioning through every migration.
+
+Builds a scratch database with the original (unversioned) tables, fills
+it with slots and bookings, double-books some of the slots as the old
+read-then-write booking path allowed, and times `upgrade()` over it. Each
+double-booked slot must keep exactly one confirmed booking, its earliest.
+
+    python benchmarks/bench_upgrade.py --slots 100000 --double-booked 500
+"""
+import argparse
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from common import make_app, remove_database, scratch_path
+from sqlalchemy import func
+from turf_app import db
+from turf_app.models import Booking
+from turf_app.schema import stamped_version, target_version, upgrade
+
+# The tables as the first release created them, before any migration.
+BASELINE_DDL = """
+CREATE TABLE user (
+    id INTEGER NOT NULL, username VARCHAR(80) NOT NULL, email VARCHAR(120) NOT NULL,
+    password_hash VARCHAR(128) NOT NULL, is_owner BOOLEAN, created_at DATETIME,
+    PRIMARY KEY (id), UNIQUE (username), UNIQUE (email)
+);
+CREATE TABLE turf (
+    id INTEGER NOT NULL, owner_id INTEGER NOT NULL, name VARCHAR(120) NOT NULL, city VARCHAR(80),
+    address VARCHAR(200), price_per_hour FLOAT NOT NULL, description TEXT, image VARCHAR(200),
+    created_at DATETIME, updated_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(owner_id) REFERENCES user (id)
+);
+CREATE TABLE slot (
+    id INTEGER NOT NULL, turf_id INTEGER NOT NULL, date DATE NOT NULL, start_time TIME NOT NULL,
+    end_time TIME NOT NULL, is_booked BOOLEAN, created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(turf_id) REFERENCES turf (id)
+);
+CREATE TABLE booking (
+    id INTEGER NOT NULL, user_id INTEGER NOT NULL, turf_id INTEGER NOT NULL, slot_id INTEGER NOT NULL,
+    status VARCHAR(20), created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id), FOREIGN KEY(turf_id) REFERENCES turf (id),
+    FOREIGN KEY(slot_id) REFERENCES slot (id)
+);
+"""
+PER_TURF = 100
+
+
+def build_baseline(path, slots, double_booked):
+    """Baseline tables with every other slot booked, and `double_booked` of those booked twice."""
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_DDL)
+    conn.executemany('INSERT INTO user VALUES (?, ?, ?, ?, ?, ?)', [
+        (1, 'owner', 'owner@bench.local', 'x', 1, '2024-01-01 00:00:00'),
+        (2, 'first', 'first@bench.local', 'x', 0, '2024-01-01 00:00:00'),
+        (3, 'second', 'second@bench.local', 'x', 0, '2024-01-01 00:00:00'),
+    ])
+    turfs = -(-slots // PER_TURF)
+    conn.executemany('INSERT INTO turf VALUES (?, 1, ?, ?, NULL, 1000.0, NULL, NULL, ?, ?)', [
+        (t, f'Turf {t}', 'Pune', '2024-01-01 00:00:00', '2024-01-01 00:00:00') for t in range(1, turfs + 1)
+    ])
+    first_day = date.today() + timedelta(days=1)
+    conn.executemany('INSERT INTO slot VALUES (?, ?, ?, ?, ?, ?, ?)', [
+        (s, (s - 1) // PER_TURF + 1, (first_day + timedelta(days=(s - 1) % PER_TURF // 16)).isoformat(),
+         f'{6 + (s - 1) % 16:02d}:00:00.000000', f'{7 + (s - 1) % 16:02d}:00:00.000000', s % 2 == 0,
+         '2024-01-01 00:00:00')
+        for s in range(1, slots + 1)
+    ])
+    booked = list(range(2, slots + 1, 2))
+    rows = [(2, slot_id) for slot_id in booked] + [(3, slot_id) for slot_id in booked[:double_booked]]
+    conn.executemany(
+        "INSERT INTO booking VALUES (?, ?, (? - 1) / 100 + 1, ?, 'confirmed', '2024-01-01 00:00:00')",
+        [(i, user_id, slot_id, slot_id) for i, (user_id, slot_id) in enumerate(rows, 1)])
+    conn.commit()
+    conn.close()
+    return booked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--slots', type=int, default=100000)
+    parser.add_argument('--double-booked', type=int, default=500)
+    args = parser.parse_args()
+
+    db_path = scratch_path()
+    try:
+        booked = build_baseline(db_path, args.slots, args.double_booked)
+        app, _ = make_app(db_path, SCHEMA_AUTO_UPGRADE=False)
+        with app.app_context():
+            started = time.perf_counter()
+            applied = upgrade()
+            seconds = time.perf_counter() - started
+            with db.engine.connect() as conn:
+                assert stamped_version(conn) == target_version()
+
+            confirmed = dict(db.session.query(Booking.slot_id, func.count())
+                             .filter(Booking.status == 'confirmed').group_by(Booking.slot_id))
+            if set(confirmed) != set(booked) or any(n != 1 for n in confirmed.values()):
+                raise SystemExit('a booked slot does not have exactly one confirmed booking')
+            kept = {b.user_id for b in Booking.query.filter(Booking.status == 'confirmed',
+                                                            Booking.slot_id.in_(booked[:args.double_booked]))}
+            if kept - {2}:
+                raise SystemExit('a later booking was kept instead of the earliest')
+            cancelled = Booking.query.filter(Booking.status == 'cancelled').count()
+
+        print(f'slots          : {args.slots:,}')
+        print(f'bookings       : {len(booked) + args.double_booked:,}')
+        print(f'migrations     : {applied[0]}..{applied[-1]}')
+        print(f'upgrade        : {seconds:.2f} s')
+        print(f'cancelled      : {cancelled:,} double booking(s), earliest kept')
+    finally:
+        remove_database(db_path)
+
+
+if __name__ == '__main__':
+    main()
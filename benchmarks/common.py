@@ -0,0 +1,57 @@
+"""Shared helpers for the benchmark scripts.
+
+Every benchmark runs against a throwaway SQLite file so the real
+``instance/database.db`` is never touched.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config  # noqa: E402
+from turf_app import create_app  # noqa: E402
+
+
+def scratch_path():
+    """A fresh empty file for a scratch database."""
+    fd, db_path = tempfile.mkstemp(prefix='turfease-bench-', suffix='.db')
+    os.close(fd)
+    return db_path
+
+
+def make_app(db_path=None, **overrides):
+    """Build an app bound to a scratch database; returns (app, db_path)."""
+    if db_path is None:
+        db_path = scratch_path()
+
+    attrs = {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path,
+        'WTF_CSRF_ENABLED': False,
+        'TESTING': True,
+        'TASKS_EAGER': True,
+        'SCHEMA_AUTO_UPGRADE': True,
+        'LOG_FILE': None,
+        'LOG_REQUESTS': False,
+    }
+    attrs.update(overrides)
+    BenchConfig = type('BenchConfig', (Config,), attrs)
+
+    app = create_app(BenchConfig)  # upgrades the scratch schema on startup
+    return app, db_path
+
+
+def remove_database(db_path):
+    """Delete a scratch database with its WAL sidecar files."""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
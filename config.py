@@ -3,5 +3,80 @@ BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-this'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(BASE_DIR, 'instance', 'database.db')
+    SQLALCHEMY_DATABASE_URI = (os.environ.get('DATABASE_URL')
+                               or 'sqlite:///' + os.path.join(BASE_DIR, 'instance', 'database.db'))
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Engine settings for the database (see turf_app/database.py): 'sqlite-tuned'
+    # (WAL, busy timeout, ...), 'postgres' (sized pool, pre-ping), 'default' (SQLAlchemy's)
+    # or 'auto', which picks by DATABASE_URL.
+    DB_PROFILE = os.environ.get('DB_PROFILE', 'auto')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    # Per worker process: pool_size connections kept open, up to max_overflow more under load.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    # Startup only checks the stamped schema version; pending migrations are applied
+    # with `flask --app run upgrade`. Auto-upgrade is handy for a fresh dev checkout;
+    # set SCHEMA_AUTO_UPGRADE=0 when several workers start against the same database.
+    SCHEMA_AUTO_UPGRADE = os.environ.get('SCHEMA_AUTO_UPGRADE', '1') == '1'
+    # Compiled templates persist here so new processes skip Jinja compilation.
+    JINJA_CACHE_DIR = os.environ.get('JINJA_CACHE_DIR') or os.path.join(BASE_DIR, 'instance', 'jinja-cache')
+    # Count SQL statements per request (always on in debug/testing) and check view budgets.
+    SQL_COUNT_QUERIES = bool(os.environ.get('SQL_COUNT_QUERIES'))
+    # Per-endpoint latency/SQL/template/size histograms, exposed at /metrics.
+    METRICS_ENABLED = True
+    # cProfile dumps: every request with PROFILE_REQUESTS, or on an `X-Profile: 1`
+    # header when PROFILER_ENABLED. Never enable either on a public deployment.
+    PROFILE_REQUESTS = bool(os.environ.get('PROFILE_REQUESTS'))
+    PROFILER_ENABLED = bool(os.environ.get('PROFILER_ENABLED'))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(BASE_DIR, 'instance', 'profiles')
+    # In-process cache of anonymous public pages (index, turf_list, turf_details).
+    PAGE_CACHE_ENABLED = True
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 60))
+    PAGE_CACHE_MAX_ENTRIES = 1024
+    PAGE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+    # Flask-Login identity snapshots (id, username, is_owner), dropped when a change to the user
+    # row is committed. Each worker process has its own cache and only sees its own commits, so
+    # other workers may serve the old username/is_owner for up to USER_CACHE_TTL seconds.
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
+    USER_CACHE_MAX_ENTRIES = 4096
+    # Availability search (/turfs/available) from per-(city, day) free-slot entries kept in
+    # memory and refreshed per turf on every booking or slot change; off = SQL every time.
+    AVAILABILITY_INDEX_ENABLED = os.environ.get('AVAILABILITY_INDEX_ENABLED', '1') == '1'
+    AVAILABILITY_INDEX_TTL = int(os.environ.get('AVAILABILITY_INDEX_TTL', 60))
+    AVAILABILITY_INDEX_MAX_ENTRIES = 64
+    # Content-addressed image uploads and their card/detail derivatives.
+    MEDIA_ROOT = os.environ.get('MEDIA_ROOT') or os.path.join(BASE_DIR, 'instance', 'media')
+    MAX_CONTENT_LENGTH = 64 * 1024 * 1024  # bulk import files; uploads are streamed to disk
+    # Background worker pool (image derivatives, cleanups).
+    TASK_WORKERS = int(os.environ.get('TASK_WORKERS', 2))
+    # Deleting a turf hides it at once and reclaims its slots and bookings in
+    # background batches, instead of one long cascading DELETE.
+    TURF_SOFT_DELETE = os.environ.get('TURF_SOFT_DELETE', '0') == '1'
+    TURF_RECLAIM_BATCH_SIZE = 5000
+    # `flask archive` moves slots older than this many days, and their bookings,
+    # to the archive tables, one batch per transaction.
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 30))
+    ARCHIVE_BATCH_SIZE = 5000
+    # Turfs per transaction when `flask rebuild-rollups` re-derives the report rollups.
+    ROLLUP_REBUILD_BATCH_SIZE = 500
+    # Fingerprinted, precompressed static assets (built at startup or with `flask build-assets`).
+    ASSETS_FINGERPRINT = True
+    ASSETS_ROOT = os.environ.get('ASSETS_ROOT') or os.path.join(BASE_DIR, 'instance', 'assets')
+    # Flask-Compress only handles dynamic pages above a size threshold; static
+    # files are served precompressed and streamed responses are left alone.
+    COMPRESS_MIMETYPES = ['text/html', 'application/json']
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_STREAMS = False
+    # JSON-lines log written by a background listener; rotates by size, or by
+    # time when LOG_ROTATE_WHEN is set (e.g. 'midnight'). An empty LOG_FILE disables it.
+    LOG_FILE = os.environ.get('LOG_FILE', os.path.join(BASE_DIR, 'instance', 'app.log'))
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_MAX_BYTES = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT = 5
+    LOG_ROTATE_WHEN = os.environ.get('LOG_ROTATE_WHEN')
+    LOG_QUEUE_SIZE = 10000
+    LOG_REQUESTS = True
@@ -1,6 +1,6 @@
 import os
-import logging
 from flask import Flask, render_template
+from jinja2 import FileSystemBytecodeCache
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_wtf import CSRFProtect
@@ -19,15 +19,15 @@ def create_app(config_class=Config):
     app = Flask(__name__, static_folder='static', template_folder='templates')
     app.config.from_object(config_class)
 
-    # --- Instance & database folder setup ---
+    # --- Instance folder setup ---
     instance_path = os.path.join(app.root_path, '..', 'instance')
     os.makedirs(instance_path, exist_ok=True)
-    db_path = os.path.join(instance_path, 'database.db')
-    if not os.path.exists(db_path):
-        open(db_path, 'a').close()  # ensure file exists
 
-    # --- Initialize extensions ---
+    # --- Initialize extensions (engine options and pragmas from DB_PROFILE) ---
+    from .database import configure_engine, init_database
+    configure_engine(app)
     db.init_app(app)
+    init_database(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     csrf.init_app(app)
@@ -40,72 +40,67 @@ def create_app(config_class=Config):
     app.register_blueprint(auth_bp)
     app.register_blueprint(main_bp)
 
-    # --- Create database tables on first run ---
-    with app.app_context():
-        try:
-            from . import models
-            db.create_all()
-            app.logger.info('Database tables created successfully.')
-        except Exception as e:
-            app.logger.error(f'Error creating database tables: {e}')
+    # --- Schema version check (tables are created by `flask upgrade`) ---
+    from .schema import check_schema
+    check_schema(app)
+
+    # --- Template bytecode cache, shared across restarts and workers ---
+    cache_dir = app.config.get('JINJA_CACHE_DIR')
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+    # --- Public page cache ---
+    from .cache import init_page_cache, init_user_cache
+    init_page_cache(app)
+    init_user_cache(app)
+
+    # --- In-memory availability index for /turfs/available ---
+    from .slotsearch import init_availability_index
+    init_availability_index(app)
+
+    # --- Fingerprinted static assets ---
+    from .assets import init_assets
+    init_assets(app)
+
+    # --- Uploaded images ---
+    from .images import image_url
+    app.add_template_global(image_url)
+
+    # --- Keyset page links ---
+    from .pagination import cursor_url
+    app.add_template_global(cursor_url)
+
+    # --- SQL statement budgets (debug/testing) ---
+    from .querybudget import init_query_budget
+    init_query_budget(app)
+
+    # --- Request metrics (/metrics) and opt-in profiler ---
+    from .metrics import init_metrics
+    init_metrics(app)
 
     # --- CLI & context setup ---
+    from .commands import register_commands
+    register_commands(app)
+
     @app.shell_context_processor
     def make_shell_context():
         from .models import User, Turf, Slot, Booking
         return {'db': db, 'User': User, 'Turf': Turf, 'Slot': Slot, 'Booking': Booking}
 
-    # --- Simple Error Handlers (temporary fix) ---
+    # --- Error Handlers ---
     @app.errorhandler(404)
     def not_found_error(error):
-        return """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>404 - Page Not Found</title>
-            <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet">
-        </head>
-        <body class="bg-light">
-            <div class="container text-center my-5 py-5">
-                <h1 class="display-1">404</h1>
-                <h2>Page Not Found</h2>
-                <p class="lead">The page you're looking for doesn't exist.</p>
-                <a href="/" class="btn btn-primary">Go Home</a>
-            </div>
-        </body>
-        </html>
-        """, 404
+        return render_template('errors/404.html'), 404
 
     @app.errorhandler(500)
     def internal_error(error):
         db.session.rollback()
-        return """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>500 - Internal Server Error</title>
-            <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet">
-        </head>
-        <body class="bg-light">
-            <div class="container text-center my-5 py-5">
-                <h1 class="display-1">500</h1>
-                <h2>Internal Server Error</h2>
-                <p class="lead">Something went wrong on our end.</p>
-                <a href="/" class="btn btn-primary">Go Home</a>
-            </div>
-        </body>
-        </html>
-        """, 500
-
-    # --- Logging setup ---
-    log_file = os.path.join(instance_path, 'app.log')
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.INFO)
-    formatter = logging.Formatter(
-        '%(asctime)s [%(levelname)s] %(module)s: %(message)s'
-    )
-    file_handler.setFormatter(formatter)
-    app.logger.addHandler(file_handler)
+        return render_template('errors/500.html'), 500
+
+    # --- Logging: JSON lines via a background queue listener ---
+    from .logs import init_logging
+    init_logging(app)
     app.logger.info('App startup complete.')
 
     return app
\ No newline at end of file
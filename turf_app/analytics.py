@@ -0,0 +1,97 @@
+from collections import namedtuple
+from sqlalchemy import and_, case, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Float
+from . import db
+from .models import Turf, Slot, Booking, SlotArchive, BookingArchive
+
+TurfStats = namedtuple('TurfStats', 'turf slot_count booking_count revenue utilization')
+OwnerStats = namedtuple('OwnerStats', 'turfs total_revenue total_bookings total_slots utilization')
+
+# ---------------------------
+# SQL HELPERS
+# ---------------------------
+class hours_between(FunctionElement):
+    """Length of a start/end TIME pair in hours, computed by the database."""
+    type = Float()
+    inherit_cache = True
+
+@compiles(hours_between)
+def _hours_between_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return "((strftime('%%s', %s) - strftime('%%s', %s)) / 3600.0)" % (
+        compiler.process(end, **kw), compiler.process(start, **kw))
+
+@compiles(hours_between, 'postgresql')
+def _hours_between_pg(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return "(EXTRACT(EPOCH FROM (%s - %s)) / 3600.0)" % (
+        compiler.process(end, **kw), compiler.process(start, **kw))
+
+def utilization_pct(bookings, slots):
+    return round((bookings / slots * 100), 1) if slots else 0
+
+# ---------------------------
+# OWNER DASHBOARD
+# ---------------------------
+# Figures cover the live tables; with include_archived the same grouped
+# query also runs over slot_archive/booking_archive and the two are added
+# up per turf, so archiving never changes an owner's lifetime numbers.
+
+def owner_stats_query(owner_id, slot_model=Slot, booking_model=Booking):
+    confirmed = and_(booking_model.slot_id == slot_model.id, booking_model.status == 'confirmed')
+    slot_revenue = hours_between(slot_model.start_time, slot_model.end_time) * Turf.price_per_hour
+    return (
+        db.session.query(
+            Turf,
+            func.count(slot_model.id),
+            func.count(booking_model.id),
+            func.coalesce(func.sum(case((booking_model.id.isnot(None), slot_revenue), else_=0)), 0),
+        )
+        .outerjoin(slot_model, slot_model.turf_id == Turf.id)
+        .outerjoin(booking_model, confirmed)
+        .filter(Turf.owner_id == owner_id, Turf.deleted_at.is_(None))
+        .group_by(Turf.id)
+        .order_by(Turf.id)
+    )
+
+def owner_stats(owner_id, include_archived=False):
+    """Per-turf and total revenue/bookings/utilization for one owner, in one query (two with the archive)."""
+    rows = owner_stats_query(owner_id).all()
+    if include_archived:
+        archived = {turf.id: counts for turf, *counts in owner_stats_query(owner_id, SlotArchive, BookingArchive)}
+        rows = [
+            (turf, *(live + old for live, old in zip(counts, archived.get(turf.id, (0, 0, 0)))))
+            for turf, *counts in rows
+        ]
+
+    turfs = [
+        TurfStats(turf, slots, bookings, round(revenue, 2), utilization_pct(bookings, slots))
+        for turf, slots, bookings, revenue in rows
+    ]
+    total_slots = sum(t.slot_count for t in turfs)
+    total_bookings = sum(t.booking_count for t in turfs)
+    return OwnerStats(
+        turfs=turfs,
+        total_revenue=round(sum(t.revenue for t in turfs), 2),
+        total_bookings=total_bookings,
+        total_slots=total_slots,
+        utilization=utilization_pct(total_bookings, total_slots),
+    )
+
+def turf_revenue_query(turf_id, slot_model=Slot, booking_model=Booking):
+    return (
+        db.session.query(func.sum(hours_between(slot_model.start_time, slot_model.end_time) * Turf.price_per_hour))
+        .select_from(booking_model)
+        .join(slot_model, slot_model.id == booking_model.slot_id)
+        .join(Turf, Turf.id == booking_model.turf_id)
+        .filter(booking_model.turf_id == turf_id, booking_model.status == 'confirmed')
+    )
+
+def turf_revenue(turf_id, include_archived=False):
+    """Revenue of one turf from its confirmed, booked slots (lifetime with include_archived)."""
+    total = turf_revenue_query(turf_id).scalar() or 0.0
+    if include_archived:
+        total += turf_revenue_query(turf_id, SlotArchive, BookingArchive).scalar() or 0.0
+    return round(total, 2)
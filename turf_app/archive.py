@@ -0,0 +1,68 @@
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from sqlalchemy import delete, func, insert, literal, select
+from . import db
+from .models import Slot, Booking, SlotArchive, BookingArchive
+
+ARCHIVE_BATCH_SIZE = 5000
+
+ArchiveReport = namedtuple('ArchiveReport', 'cutoff slots bookings batches seconds dry_run')
+
+# ---------------------------
+# HOT/COLD ARCHIVAL
+# ---------------------------
+# Slots dated before the cutoff, and every booking on them, are copied into
+# slot_archive/booking_archive and deleted from the live tables, one batch
+# of slots per transaction: a batch is an INSERT ... SELECT per table and a
+# DELETE of the slots (their bookings follow by ON DELETE CASCADE), so the
+# write lock is only held for one batch at a time and the job can run
+# alongside traffic. A dry run only counts what would move.
+
+SLOT_COLUMNS = [c.name for c in Slot.__table__.columns]
+BOOKING_COLUMNS = [c.name for c in Booking.__table__.columns]
+
+def archive_cutoff(days):
+    """First slot date kept live when keeping `days` days of history."""
+    return date.today() - timedelta(days=days)
+
+def _copy(archive, model, columns, where):
+    now = literal(datetime.utcnow(), archive.archived_at.type)
+    source = select(*[model.__table__.c[name] for name in columns], now).where(where)
+    return db.session.execute(
+        insert(archive).from_select(columns + ['archived_at'], source)
+    ).rowcount
+
+def archive_id_conflicts():
+    """(slots, bookings) in the live tables whose id is already in the archive; both 0 once ids are unique."""
+    return tuple(
+        db.session.execute(
+            select(func.count()).select_from(model).where(model.id.in_(select(archive.id)))
+        ).scalar()
+        for model, archive in ((Slot, SlotArchive), (Booking, BookingArchive))
+    )
+
+def archive_slots(cutoff, batch_size=ARCHIVE_BATCH_SIZE, dry_run=False):
+    """Move slots dated before `cutoff` and their bookings to the archive; returns an ArchiveReport."""
+    started = time.perf_counter()
+    old = Slot.date < cutoff
+    if dry_run:
+        slots = db.session.execute(select(func.count()).select_from(Slot).where(old)).scalar()
+        bookings = db.session.execute(
+            select(func.count()).select_from(Booking).join(Slot, Slot.id == Booking.slot_id).where(old)
+        ).scalar()
+        batches = -(-slots // batch_size)
+        return ArchiveReport(cutoff, slots, bookings, batches, time.perf_counter() - started, True)
+
+    slots = bookings = batches = 0
+    while True:
+        ids = db.session.execute(select(Slot.id).where(old).limit(batch_size)).scalars().all()
+        if not ids:
+            break
+        _copy(SlotArchive, Slot, SLOT_COLUMNS, Slot.id.in_(ids))
+        bookings += _copy(BookingArchive, Booking, BOOKING_COLUMNS, Booking.slot_id.in_(ids))
+        db.session.execute(delete(Slot).where(Slot.id.in_(ids)))
+        db.session.commit()
+        slots += len(ids)
+        batches += 1
+    return ArchiveReport(cutoff, slots, bookings, batches, time.perf_counter() - started, False)
@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from flask import abort, current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # brotli is optional: gzip variants are always written.
+    brotli = None
+
+ASSET_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.map', '.txt'}
+ASSET_MAX_AGE = 365 * 24 * 3600
+MANIFEST = 'manifest.json'
+BUILD_CACHE = 'build-cache.json'  # source -> [mtime_ns, size, fingerprinted name]
+
+# Accept-Encoding token -> file suffix, in order of preference.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# ---------------------------
+# BUILD STEP
+# ---------------------------
+# Text assets under static/ are copied once into ASSETS_ROOT as
+# <name>.<sha256[:12]><ext>, next to .gz and .br variants, and a manifest
+# maps the original name to the fingerprinted one. Nothing is compressed
+# per request, and since a fingerprinted name never changes content it is
+# served with immutable cache headers. Startup only stats the sources:
+# a file whose mtime and size match the build cache, and whose built copy
+# exists, is neither read nor hashed again. `flask build-assets` rebuilds
+# everything.
+
+def _fingerprinted(filename, digest):
+    stem, ext = os.path.splitext(filename)
+    return f'{stem}.{digest[:12]}{ext}'
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'  # several workers may build at once
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _load_json(path):
+    try:
+        with open(path, 'rb') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def build_assets(static_folder, assets_root, force=False):
+    """Fingerprint and precompress static text assets; returns the manifest."""
+    cache = {} if force else _load_json(os.path.join(assets_root, BUILD_CACHE))
+    manifest, stats = {}, {}
+    for dirpath, _, filenames in os.walk(static_folder):
+        for name in filenames:
+            if os.path.splitext(name)[1].lower() not in ASSET_EXTENSIONS:
+                continue
+            source = os.path.join(dirpath, name)
+            filename = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            st = os.stat(source)
+            cached = cache.get(filename)
+            if (cached and cached[:2] == [st.st_mtime_ns, st.st_size]
+                    and os.path.exists(os.path.join(assets_root, cached[2]))):
+                manifest[filename], stats[filename] = cached[2], cached
+                continue
+
+            with open(source, 'rb') as f:
+                data = f.read()
+            built = _fingerprinted(filename, hashlib.sha256(data).hexdigest())
+            manifest[filename] = built
+            stats[filename] = [st.st_mtime_ns, st.st_size, built]
+
+            target = os.path.join(assets_root, built)
+            if os.path.exists(target) and not force:
+                continue  # same content already built
+            _write(target + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write(target + '.br', brotli.compress(data, quality=11))
+            _write(target, data)
+
+    if stats != cache or not os.path.exists(os.path.join(assets_root, MANIFEST)):
+        _write(os.path.join(assets_root, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+        _write(os.path.join(assets_root, BUILD_CACHE), json.dumps(stats, sort_keys=True).encode())
+    return manifest
+
+# ---------------------------
+# SERVING
+# ---------------------------
+def serve_asset(filename):
+    """Serve a fingerprinted asset, picking the best precompressed variant."""
+    if filename not in current_app.extensions['asset_manifest'].values():
+        abort(404)
+    root = current_app.config['ASSETS_ROOT']
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if request.accept_encodings[name] and os.path.exists(os.path.join(root, filename + suffix)):
+            encoding, filename = name, filename + suffix
+            break
+
+    response = send_from_directory(root, filename, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+def static_url_for(endpoint, **values):
+    """url_for() for templates: known static assets resolve to their fingerprinted URL."""
+    if endpoint == 'static':
+        built = current_app.extensions['asset_manifest'].get(values.get('filename'))
+        if built is not None:
+            values['filename'] = built
+            endpoint = 'assets'
+    return url_for(endpoint, **values)
+
+def init_assets(app):
+    manifest = {}
+    if app.config.get('ASSETS_FINGERPRINT', True):
+        try:
+            manifest = build_assets(app.static_folder, app.config['ASSETS_ROOT'])
+        except OSError as e:
+            app.logger.error(f'Could not build static assets, serving them unversioned: {e}')
+    app.extensions['asset_manifest'] = manifest
+    app.add_url_rule('/assets/<path:filename>', 'assets', serve_asset)
+    app.jinja_env.globals['url_for'] = static_url_for
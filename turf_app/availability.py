@@ -0,0 +1,60 @@
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from sqlalchemy import and_, or_
+from . import db
+from .models import Slot
+
+DEFAULT_WINDOW_DAYS = 7
+MAX_WINDOW_DAYS = 31
+
+DayAvailability = namedtuple('DayAvailability', 'date slots bitmap')
+
+# ---------------------------
+# AVAILABILITY WINDOW
+# ---------------------------
+def window(start=None, days=None):
+    """Clamp a window to start no earlier than today and span at most MAX_WINDOW_DAYS; returns (start, end) inclusive."""
+    today = date.today()
+    start = max(start or today, today)
+    days = max(1, min(days or DEFAULT_WINDOW_DAYS, MAX_WINDOW_DAYS))
+    return start, start + timedelta(days=days - 1)
+
+def window_slots_query(turf_id, start, end, free_only=True):
+    """Slots of one turf inside the window that have not started yet, as lightweight rows."""
+    now = datetime.now()
+    query = (
+        db.session.query(Slot.id, Slot.date, Slot.start_time, Slot.end_time, Slot.is_booked)
+        .filter(
+            Slot.turf_id == turf_id,
+            Slot.date.between(start, end),
+            or_(Slot.date > now.date(), and_(Slot.date == now.date(), Slot.start_time > now.time())),
+        )
+        .order_by(Slot.date, Slot.start_time)
+    )
+    if free_only:
+        query = query.filter(Slot.is_booked.is_(False))
+    return query
+
+def free_slots_by_day(turf_id, start=None, days=None):
+    """Free future slots in the window, grouped per day (days without free slots are omitted)."""
+    start, end = window(start, days)
+    rows = window_slots_query(turf_id, start, end, free_only=True).all()
+    return [
+        DayAvailability(day, list(slots), None)
+        for day, slots in groupby(rows, key=lambda row: row.date)
+    ]
+
+def availability_bitmaps(turf_id, start=None, days=None):
+    """Per-day free/booked bitmap ('1' = free, '0' = booked, in start-time order) plus the free slots."""
+    start, end = window(start, days)
+    rows = window_slots_query(turf_id, start, end, free_only=False).all()
+    result = []
+    for day, slots in groupby(rows, key=lambda row: row.date):
+        slots = list(slots)
+        result.append(DayAvailability(
+            day,
+            [s for s in slots if not s.is_booked],
+            ''.join('0' if s.is_booked else '1' for s in slots),
+        ))
+    return start, end, result
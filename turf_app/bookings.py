@@ -0,0 +1,68 @@
+from datetime import datetime
+from sqlalchemy import and_, exists, or_, update
+from sqlalchemy.exc import IntegrityError
+from . import db, rollups
+from .cache import invalidate_turf
+from .models import Turf, Slot, Booking
+
+# ---------------------------
+# BOOKING ENGINE
+# ---------------------------
+# A slot is claimed with one conditional UPDATE (only if it is still free),
+# so concurrent bookers never read-then-write the same row. The loser sees
+# zero rows claimed and gets a clean "already taken" result straight away.
+# Slots that have already started cannot be claimed, and should a second
+# confirmed booking still reach the unique index on booking.slot_id, that
+# booker gets the same result instead of an error.
+
+def claim_slot(slot_id, user_id):
+    """Book a slot for a user. Returns the new Booking, or None if taken or already started."""
+    now = datetime.now()
+    turf_id = db.session.execute(
+        update(Slot)
+        .where(Slot.id == slot_id, Slot.is_booked.is_(False),
+               or_(Slot.date > now.date(), and_(Slot.date == now.date(), Slot.start_time > now.time())),
+               ~exists().where(Turf.id == Slot.turf_id, Turf.deleted_at.isnot(None)))
+        .values(is_booked=True)
+        .returning(Slot.turf_id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if turf_id is None:
+        db.session.rollback()
+        return None
+
+    booking = Booking(user_id=user_id, turf_id=turf_id, slot_id=slot_id)
+    db.session.add(booking)
+    try:
+        rollups.booking_changed(slot_id, 1)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return None
+    invalidate_turf(turf_id)
+    return booking
+
+def release_booking(booking_id):
+    """Cancel a confirmed booking and free its slot so it can be rebooked."""
+    released = db.session.execute(
+        update(Booking)
+        .where(Booking.id == booking_id, Booking.status == 'confirmed')
+        .values(status='cancelled')
+        .returning(Booking.slot_id, Booking.turf_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if released is None:
+        db.session.rollback()
+        return False
+    slot_id, turf_id = released
+
+    rollups.booking_changed(slot_id, -1)
+    db.session.execute(
+        update(Slot)
+        .where(Slot.id == slot_id)
+        .values(is_booked=False)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    invalidate_turf(turf_id)
+    return True
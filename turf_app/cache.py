@@ -0,0 +1,182 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, session
+
+# ---------------------------
+# LRU + TTL CACHE
+# ---------------------------
+class LRUCache:
+    """Thread-safe LRU cache with a per-entry TTL, an entry cap and an optional byte budget.
+
+    Entries can carry tags; invalidate_tag() drops every entry with that tag.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self._data = OrderedDict()  # key -> (expires_at, size, tags, value)
+        self._tags = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def set(self, key, value, tags=()):
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, size, tuple(tags), value)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._data and (len(self._data) > self.max_entries or
+                                  (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+
+    def values(self):
+        """Snapshot of the live values (expired entries are skipped, not removed)."""
+        now = time.monotonic()
+        with self._lock:
+            return [entry[3] for entry in self._data.values() if entry[0] >= now]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def _remove(self, key):
+        _, size, tags, _ = self._data.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+# ---------------------------
+# PUBLIC PAGE CACHE
+# ---------------------------
+# Rendered anonymous GET pages, keyed by endpoint + view args + query args.
+# Writes invalidate by tag: 'turfs' for the turf listings, 'turf:<id>' for
+# one turf's pages. The cache is per process, so with several workers the
+# TTL bounds how long another worker can serve a stale page. Revalidation
+# is by ETag only: no single timestamp covers a page's slots, bookings and
+# deleted turfs, so there is no Last-Modified to answer If-Modified-Since.
+page_cache = LRUCache(sizeof=lambda page: len(page[0]))
+
+def init_page_cache(app):
+    page_cache.ttl = app.config.get('PAGE_CACHE_TTL', 60)
+    page_cache.max_entries = app.config.get('PAGE_CACHE_MAX_ENTRIES', 1024)
+    page_cache.max_bytes = app.config.get('PAGE_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+
+def invalidate_turfs():
+    """A turf was added, edited or deleted: drop the turf listings."""
+    page_cache.invalidate_tag('turfs')
+
+def invalidate_turf(turf_id):
+    """A turf's slots or bookings changed: drop that turf's pages and refresh its availability."""
+    from .slotsearch import availability_index
+
+    page_cache.invalidate_tag(f'turf:{turf_id}')
+    availability_index.mark_dirty(turf_id)
+
+def _is_anonymous_view():
+    # Checked on the session directly so a cache hit never loads the user.
+    cookie = current_app.config.get('REMEMBER_COOKIE_NAME', 'remember_token')
+    return ('_user_id' not in session and '_flashes' not in session
+            and cookie not in request.cookies)
+
+def cached_page(*tags):
+    """Serve anonymous GETs of a view from the page cache.
+
+    Tag templates are formatted with the view arguments, e.g. 'turf:{turf_id}'.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if (request.method != 'GET' or not current_app.config.get('PAGE_CACHE_ENABLED', True)
+                    or not _is_anonymous_view()):
+                return view(*args, **kwargs)
+
+            key = (request.endpoint, tuple(sorted(kwargs.items())),
+                   tuple(sorted(request.args.items(multi=True))))
+            page = page_cache.get(key)
+            state = 'HIT'
+            if page is None:
+                state = 'MISS'
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                body = response.get_data()
+                page = (body, response.mimetype, hashlib.sha1(body).hexdigest())
+                page_cache.set(key, page, tags=[tag.format(**kwargs) for tag in tags])
+
+            body, mimetype, etag = page
+            response = current_app.response_class(body, mimetype=mimetype)
+            response.set_etag(etag)
+            response.cache_control.public = True
+            response.cache_control.no_cache = True
+            response.headers['X-Cache'] = state
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+# ---------------------------
+# USER IDENTITY CACHE
+# ---------------------------
+# Flask-Login's user loader runs on every authenticated request. It keeps
+# slim detached snapshots (id, username, is_owner) here instead of querying
+# the user row each time; models invalidate an entry when a change to the row
+# is committed. The cache is per process: see USER_CACHE_TTL in config.py.
+user_cache = LRUCache(max_entries=4096, ttl=300)
+
+def init_user_cache(app):
+    user_cache.ttl = app.config.get('USER_CACHE_TTL', 300)
+    user_cache.max_entries = app.config.get('USER_CACHE_MAX_ENTRIES', 4096)
+
+def invalidate_user(user_id):
+    user_cache.delete(int(user_id))
@@ -0,0 +1,237 @@
+import csv
+import os
+import tempfile
+import time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from . import db
+
+def register_commands(app):
+    app.cli.add_command(upgrade_command)
+    app.cli.add_command(check_query_plans)
+    app.cli.add_command(build_assets_command)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(export_bookings_command)
+    app.cli.add_command(import_command)
+    app.cli.add_command(purge_turfs_command)
+    app.cli.add_command(archive_command)
+    app.cli.add_command(rebuild_rollups_command)
+
+# ---------------------------
+# SCHEMA
+# ---------------------------
+@click.command('upgrade')
+@with_appcontext
+def upgrade_command():
+    """Apply pending schema migrations and stamp the schema version."""
+    from .schema import stamped_version, target_version, upgrade
+
+    applied = upgrade()
+    for version in applied:
+        click.echo(f'Applied migration {version}')
+    with db.engine.connect() as conn:
+        click.echo(f'Schema at version {stamped_version(conn)} (code expects {target_version()}).')
+
+# ---------------------------
+# SYNTHETIC DATA
+# ---------------------------
+@click.command('seed')
+@with_appcontext
+@click.option('--users', default=50000, show_default=True, help='Users to add (owners included).')
+@click.option('--owners', default=2000, show_default=True, help='How many of the users own turfs.')
+@click.option('--turfs', default=10000, show_default=True, help='Turfs to add.')
+@click.option('--slots', default=5000000, show_default=True, help='Slots to add, spread evenly over the turfs.')
+@click.option('--bookings', default=1000000, show_default=True, help='Confirmed bookings to add.')
+@click.option('--batch', default=10000, show_default=True, help='Rows per INSERT batch.')
+@click.option('--seed', 'random_seed', default=42, show_default=True, help='Random seed.')
+def seed_command(users, owners, turfs, slots, bookings, batch, random_seed):
+    """Append a synthetic dataset for load testing (password for every user: "password")."""
+    from .rollups import rebuild_rollups
+    from .seed import seed_database
+
+    def progress(name, count):
+        if name != 'slots' or count % (batch * 50) == 0 or count == slots:
+            click.echo(f'  {name}: {count:,}')
+
+    started = time.perf_counter()
+    try:
+        result = seed_database(users=users, owners=owners, turfs=turfs, slots=slots, bookings=bookings,
+                               batch=batch, seed=random_seed, progress=progress)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    click.echo(f'Seeded {result.users:,} users, {result.turfs:,} turfs, {result.slots:,} slots and '
+               f'{result.bookings:,} bookings in {time.perf_counter() - started:.1f}s.')
+    rollups = rebuild_rollups(current_app.config['ROLLUP_REBUILD_BATCH_SIZE'])
+    click.echo(f'Rebuilt the report rollups in {rollups.seconds:.1f}s.')
+
+def _owner(owner):
+    """Look up an owner by username or id for the commands that act on their turfs."""
+    from .models import User
+
+    user = User.query.filter((User.username == owner) | (User.id == (int(owner) if owner.isdigit() else -1))).first()
+    if user is None or not user.is_owner:
+        raise click.BadParameter(f'no owner named {owner!r}', param_hint='OWNER')
+    return user
+
+# ---------------------------
+# EXPORTS
+# ---------------------------
+@click.command('export-bookings')
+@with_appcontext
+@click.argument('owner')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default='csv', show_default=True)
+@click.option('--start', type=click.DateTime(['%Y-%m-%d']), help='First slot date to include.')
+@click.option('--end', type=click.DateTime(['%Y-%m-%d']), help='Last slot date to include.')
+@click.option('--status', type=click.Choice(['confirmed', 'cancelled']), help='Only bookings in this status.')
+@click.option('--output', type=click.File('w'), default='-', help='File to write (default: stdout).')
+def export_bookings_command(owner, fmt, start, end, status, output):
+    """Stream all bookings on OWNER's turfs (username or id) as CSV or NDJSON."""
+    from .exports import export_bookings
+
+    user = _owner(owner)
+    for chunk in export_bookings(user.id, fmt, start=start and start.date(), end=end and end.date(),
+                                 status=status):
+        output.write(chunk)
+
+# ---------------------------
+# BULK IMPORT
+# ---------------------------
+@click.command('import')
+@with_appcontext
+@click.argument('kind', type=click.Choice(['turfs', 'slots']))
+@click.argument('owner')
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+              help='File format (default: from the file extension).')
+@click.option('--chunk-size', default=5000, show_default=True, help='Rows per INSERT transaction.')
+@click.option('--errors', 'errors_file', type=click.File('w'), help='Write the per-row error report (CSV) here.')
+def import_command(kind, owner, source, fmt, chunk_size, errors_file):
+    """Stream-import turfs or slots for OWNER from a CSV or NDJSON file ('-' for stdin)."""
+    from .imports import bulk_import, detect_format
+
+    user = _owner(owner)
+    started = time.perf_counter()
+    report = bulk_import(user.id, kind, source, fmt or detect_format(source.name), chunk_size)
+    click.echo(f'Imported {report.created:,} {kind}, rejected {report.failed:,} '
+               f'in {time.perf_counter() - started:.1f}s.')
+    if errors_file is not None:
+        writer = csv.writer(errors_file)
+        writer.writerow(['line', 'error'])
+        writer.writerows(report.errors)
+    else:
+        for error in report.errors[:20]:
+            click.echo(f'  line {error.line}: {error.message}', err=True)
+    if report.failed > len(report.errors):
+        click.echo(f'  (only the first {len(report.errors)} errors are reported)', err=True)
+    if report.stopped:
+        raise click.ClickException(f'line {report.stopped.line}: {report.stopped.message}')
+
+# ---------------------------
+# SOFT-DELETED TURFS
+# ---------------------------
+@click.command('purge-turfs')
+@with_appcontext
+@click.option('--batch-size', type=int, help='Slots deleted per transaction (default: TURF_RECLAIM_BATCH_SIZE).')
+def purge_turfs_command(batch_size):
+    """Delete the rows of every soft-deleted turf, in short batches."""
+    from .deletion import purge_deleted_turfs
+
+    started = time.perf_counter()
+    result = purge_deleted_turfs(batch_size or current_app.config.get('TURF_RECLAIM_BATCH_SIZE'))
+    click.echo(f'Purged {result.turfs:,} turf(s) and {result.slots:,} slot(s) '
+               f'in {time.perf_counter() - started:.1f}s.')
+
+# ---------------------------
+# ARCHIVAL
+# ---------------------------
+@click.command('archive')
+@with_appcontext
+@click.option('--days', type=int, help='Days of past slots to keep live (default: ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', type=int, help='Slots moved per transaction (default: ARCHIVE_BATCH_SIZE).')
+@click.option('--dry-run', is_flag=True, help='Only count what would be moved.')
+def archive_command(days, batch_size, dry_run):
+    """Move past slots and their bookings out of the live tables into the archive."""
+    from .archive import archive_cutoff, archive_id_conflicts, archive_slots
+
+    slot_clashes, booking_clashes = archive_id_conflicts()
+    if slot_clashes or booking_clashes:
+        raise click.ClickException(
+            f'{slot_clashes:,} live slot(s) and {booking_clashes:,} booking(s) reuse archived ids; '
+            f'run `flask --app run upgrade` to renumber them before archiving.')
+    config = current_app.config
+    cutoff = archive_cutoff(config['ARCHIVE_AFTER_DAYS'] if days is None else days)
+    report = archive_slots(cutoff, batch_size or config['ARCHIVE_BATCH_SIZE'], dry_run=dry_run)
+    verb = 'Would move' if report.dry_run else 'Moved'
+    click.echo(f'{verb} {report.slots:,} slots and {report.bookings:,} bookings dated before {report.cutoff} '
+               f'in {report.batches:,} batch(es), {report.seconds:.1f}s.')
+
+# ---------------------------
+# REPORT ROLLUPS
+# ---------------------------
+@click.command('rebuild-rollups')
+@with_appcontext
+@click.option('--batch-size', type=int, help='Turfs per transaction (default: ROLLUP_REBUILD_BATCH_SIZE).')
+def rebuild_rollups_command(batch_size):
+    """Re-derive the per turf/day/hour report rollups from the live and archived slots."""
+    from .rollups import rebuild_rollups
+
+    result = rebuild_rollups(batch_size or current_app.config['ROLLUP_REBUILD_BATCH_SIZE'])
+    click.echo(f'Rebuilt {result.rows:,} rollup rows for {result.turfs:,} turfs in {result.seconds:.1f}s.')
+
+# ---------------------------
+# STATIC ASSETS
+# ---------------------------
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Fingerprint static assets and write their gzip/brotli variants."""
+    from .assets import build_assets
+
+    manifest = build_assets(current_app.static_folder, current_app.config['ASSETS_ROOT'], force=True)
+    for source, built in sorted(manifest.items()):
+        click.echo(f'{source} -> {built}')
+    click.echo(f'{len(manifest)} asset(s) built into {current_app.config["ASSETS_ROOT"]}')
+
+# ---------------------------
+# QUERY PLAN REGRESSION CHECK
+# ---------------------------
+@click.command('check-query-plans')
+@with_appcontext
+@click.option('--turfs', default=2000, show_default=True, help='Turfs to seed.')
+@click.option('--slots-per-turf', default=30, show_default=True, help='Slots to seed per turf.')
+@click.option('--bookings', default=20000, show_default=True, help='Bookings to seed.')
+def check_query_plans(turfs, slots_per_turf, bookings):
+    """Seed a scratch database and fail if any hot route query does a full table scan."""
+    from config import Config
+    from . import create_app
+    from .queryplan import check_route_plans, explain, route_queries, seed_plan_dataset
+
+    fd, path = tempfile.mkstemp(prefix='turfease-plans-', suffix='.db')
+    os.close(fd)
+    scratch_config = type('PlanCheckConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path,
+        'SECRET_KEY': current_app.config['SECRET_KEY'],
+        'SCHEMA_AUTO_UPGRADE': True,
+    })
+    try:
+        scratch = create_app(scratch_config)
+        with scratch.app_context():
+            sample = seed_plan_dataset(turfs=turfs, slots_per_turf=slots_per_turf, bookings=bookings)
+            for route, query in route_queries(sample).items():
+                click.echo(f'{route}:')
+                for line in explain(query):
+                    click.echo(f'    {line}')
+            failures = check_route_plans(sample)
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    if failures:
+        for route, scans in failures.items():
+            click.echo(f'FULL SCAN in {route}: {"; ".join(scans)}', err=True)
+        raise SystemExit(1)
+    click.echo('All route queries use indexes.')
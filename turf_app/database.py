@@ -0,0 +1,121 @@
+import sqlite3
+from functools import partial
+from sqlalchemy import event, func, select, text
+from sqlalchemy.engine import make_url
+from . import db
+
+PROFILES = ('auto', 'default', 'sqlite-tuned', 'postgres')
+
+# ---------------------------
+# DATABASE PROFILES
+# ---------------------------
+# DATABASE_URL picks the database and DB_PROFILE how the engine talks to it:
+#
+#   default       SQLAlchemy's own settings (rollback journal, synchronous=FULL,
+#                 the driver's 5 s lock wait)
+#   sqlite-tuned  WAL, synchronous=NORMAL, a busy timeout, a larger page
+#                 cache and mmap on every connection, so concurrent workers
+#                 read while one writes and wait for the write lock
+#                 instead of failing with "database is locked"
+#   postgres      a sized connection pool with pre-ping, so connections
+#                 dropped by the server or a proxy are replaced unnoticed
+#   auto          sqlite-tuned for SQLite, postgres for PostgreSQL
+#
+# Every SQLite connection enforces foreign keys whatever the profile:
+# deletes rely on ON DELETE CASCADE.
+
+def database_uri(url):
+    """A DATABASE_URL as SQLAlchemy spells it (postgres:// is postgresql:// there)."""
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def resolve_profile(config):
+    profile = config.get('DB_PROFILE') or 'auto'
+    if profile not in PROFILES:
+        raise ValueError(f'DB_PROFILE must be one of {", ".join(PROFILES)}, not {profile!r}')
+    if profile != 'auto':
+        return profile
+    backend = make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    return {'sqlite': 'sqlite-tuned', 'postgresql': 'postgres'}.get(backend, 'default')
+
+def sqlite_pragmas(config, profile):
+    """PRAGMA statements run on each new SQLite connection."""
+    pragmas = ['foreign_keys=ON']
+    if profile == 'sqlite-tuned':
+        pragmas += [
+            'journal_mode=WAL',
+            'synchronous=NORMAL',
+            f'busy_timeout={int(config["SQLITE_BUSY_TIMEOUT_MS"])}',
+            f'cache_size=-{int(config["SQLITE_CACHE_SIZE_KB"])}',
+            f'mmap_size={int(config["SQLITE_MMAP_SIZE"])}',
+            'temp_store=MEMORY',
+        ]
+    return pragmas
+
+def engine_options(config, profile):
+    """SQLALCHEMY_ENGINE_OPTIONS for a profile."""
+    if profile == 'postgres':
+        return {
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+            'pool_recycle': config['DB_POOL_RECYCLE'],
+            'pool_pre_ping': True,
+        }
+    if profile == 'sqlite-tuned':
+        # pysqlite's own lock wait, for the connect itself; busy_timeout covers the rest.
+        return {'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000}}
+    return {}
+
+def _run_pragmas(pragmas, dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(f'PRAGMA {pragma}')
+        cursor.close()
+
+def configure_engine(app):
+    """Before db.init_app: engine options for the profile (explicit SQLALCHEMY_ENGINE_OPTIONS win)."""
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(app.config['SQLALCHEMY_DATABASE_URI'])
+    profile = resolve_profile(app.config)
+    app.config['DB_PROFILE_ACTIVE'] = profile
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(app.config, profile),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+    }
+
+def init_database(app):
+    """After db.init_app: the profile's pragmas on every new SQLite connection."""
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == 'sqlite':
+        pragmas = sqlite_pragmas(app.config, app.config['DB_PROFILE_ACTIVE'])
+        event.listen(engine, 'connect', partial(_run_pragmas, pragmas))
+
+# ---------------------------
+# ID SEQUENCES
+# ---------------------------
+def next_free_id(conn, table):
+    """An id above every id in `table` and every id the database has handed out for it."""
+    top = conn.execute(select(func.max(table.c.id))).scalar() or 0
+    if conn.dialect.name == 'postgresql':
+        # Consumes one value, which is fine: the caller advances the sequence past its own rows.
+        top = max(top, conn.execute(text("SELECT nextval(pg_get_serial_sequence(:name, 'id'))"),
+                                    {'name': table.name}).scalar())
+    elif conn.dialect.name == 'sqlite' and table.dialect_options['sqlite']['autoincrement']:
+        top = max(top, conn.execute(text('SELECT seq FROM sqlite_sequence WHERE name = :name'),
+                                    {'name': table.name}).scalar() or 0)
+    return top + 1
+
+def advance_id_sequence(conn, table, floor=0):
+    """Make the next id the database assigns in `table` exceed `floor` and every id already there."""
+    top = max(floor, conn.execute(select(func.max(table.c.id))).scalar() or 0)
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text("SELECT setval(pg_get_serial_sequence(:name, 'id'), :top, :called)"),
+                     {'name': table.name, 'top': max(top, 1), 'called': top > 0})
+    elif conn.dialect.name == 'sqlite' and table.dialect_options['sqlite']['autoincrement']:
+        conn.execute(text('DELETE FROM sqlite_sequence WHERE name = :name'), {'name': table.name})
+        conn.execute(text('INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :top)'),
+                     {'name': table.name, 'top': top})
+    # A plain SQLite INTEGER PRIMARY KEY already continues from max(id).
@@ -0,0 +1,82 @@
+from collections import namedtuple
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import delete, select, update
+from . import db, rollups, tasks
+from .cache import invalidate_turf, invalidate_turfs
+from .models import Turf, Slot, SlotArchive
+
+RECLAIM_BATCH_SIZE = 5000
+
+PurgeResult = namedtuple('PurgeResult', 'turfs slots')
+
+# ---------------------------
+# SET-BASED DELETES
+# ---------------------------
+# A turf or slot goes with one DELETE by id. Its slots, bookings and
+# rollups are removed by the database through ON DELETE CASCADE (schema
+# enables foreign keys on every SQLite connection), so nothing is loaded
+# into the session first, however many rows hang off it.
+
+def delete_slot(slot_id):
+    """Delete a slot and, by cascade, its bookings."""
+    rollups.slot_removed(slot_id)
+    db.session.execute(delete(Slot).where(Slot.id == slot_id))
+    db.session.commit()
+
+def delete_turf(turf_id):
+    """Delete a turf and, by cascade, its slots and bookings, in one transaction."""
+    db.session.execute(delete(Turf).where(Turf.id == turf_id))
+    db.session.commit()
+    invalidate_turfs()
+    invalidate_turf(turf_id)
+
+# ---------------------------
+# SOFT DELETE
+# ---------------------------
+# With TURF_SOFT_DELETE a turf with years of slots does not hold the write
+# lock for one long cascade: it is stamped deleted_at (every listing and
+# lookup filters those out), then a background job deletes its live and
+# archived slots RECLAIM_BATCH_SIZE at a time, each batch its own short
+# transaction, and the turf row last. `flask purge-turfs` finishes any
+# reclaim a restart interrupted.
+
+def soft_delete_turf(turf_id):
+    """Hide a turf at once and queue the reclaim of its rows."""
+    db.session.execute(update(Turf).where(Turf.id == turf_id).values(deleted_at=datetime.utcnow()))
+    db.session.commit()
+    invalidate_turfs()
+    invalidate_turf(turf_id)
+    return tasks.submit(reclaim_turf, turf_id, current_app.config.get('TURF_RECLAIM_BATCH_SIZE'))
+
+def remove_turf(turf_id):
+    """Delete a turf the way the app is configured to: soft (background reclaim) or at once."""
+    if current_app.config.get('TURF_SOFT_DELETE'):
+        soft_delete_turf(turf_id)
+    else:
+        delete_turf(turf_id)
+
+def reclaim_turf(turf_id, batch_size=None):
+    """Delete a soft-deleted turf's slots in batches, then the turf; returns the slots removed."""
+    batch_size = batch_size or RECLAIM_BATCH_SIZE
+    is_deleted = Turf.id == turf_id, Turf.deleted_at.isnot(None)
+    if db.session.execute(select(Turf.id).where(*is_deleted)).first() is None:
+        return 0
+    removed = 0
+    for model in (Slot, SlotArchive):
+        while True:
+            batch = select(model.id).where(model.turf_id == turf_id).limit(batch_size)
+            count = db.session.execute(delete(model).where(model.id.in_(batch))).rowcount
+            db.session.commit()
+            removed += count
+            if count < batch_size:
+                break
+    db.session.execute(delete(Turf).where(*is_deleted))
+    db.session.commit()
+    return removed
+
+def purge_deleted_turfs(batch_size=None):
+    """Reclaim every soft-deleted turf still in the database; returns a PurgeResult."""
+    turf_ids = db.session.execute(select(Turf.id).where(Turf.deleted_at.isnot(None))).scalars().all()
+    slots = sum(reclaim_turf(turf_id, batch_size) for turf_id in turf_ids)
+    return PurgeResult(len(turf_ids), slots)
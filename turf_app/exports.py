@@ -0,0 +1,83 @@
+import csv
+import io
+import json
+from sqlalchemy import select
+from . import db
+from .analytics import hours_between
+from .models import User, Turf, Slot, Booking
+
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+EXPORT_COLUMNS = ('booking_id', 'booked_at', 'status', 'turf_id', 'turf', 'city', 'date',
+                  'start_time', 'end_time', 'player', 'price_per_hour', 'amount')
+BATCH_SIZE = 1000
+
+# ---------------------------
+# BOOKING EXPORT
+# ---------------------------
+# One column-only SELECT over the owner's bookings, iterated in batches of
+# BATCH_SIZE rows (yield_per), and written out one row at a time. Memory
+# stays flat however many bookings there are. The CSV header is sent
+# before the query runs and the first row as soon as it is fetched; after
+# that, output goes out in chunks of BATCH_SIZE rows.
+
+def owner_bookings_query(owner_id, start=None, end=None, status=None):
+    """Bookings on an owner's turfs, optionally by slot date range and status, oldest first."""
+    query = (
+        select(Booking.id, Booking.created_at, Booking.status, Turf.id, Turf.name, Turf.city,
+               Slot.date, Slot.start_time, Slot.end_time, User.username, Turf.price_per_hour,
+               (Turf.price_per_hour * hours_between(Slot.start_time, Slot.end_time)))
+        .join(Turf, Booking.turf_id == Turf.id)
+        .join(Slot, Booking.slot_id == Slot.id)
+        .join(User, Booking.user_id == User.id)
+        .where(Turf.owner_id == owner_id, Turf.deleted_at.is_(None))
+        .order_by(Booking.id)
+    )
+    if start is not None:
+        query = query.where(Slot.date >= start)
+    if end is not None:
+        query = query.where(Slot.date <= end)
+    if status:
+        query = query.where(Booking.status == status)
+    return query
+
+def iter_booking_rows(owner_id, **filters):
+    result = db.session.execute(owner_bookings_query(owner_id, **filters),
+                                execution_options={'yield_per': BATCH_SIZE})
+    for row in result:
+        yield dict(zip(EXPORT_COLUMNS, row))
+
+def _plain(value):
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return value.isoformat()
+
+def _drain(buffer):
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
+
+def csv_stream(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield _drain(buffer)
+    for n, row in enumerate(rows, 1):
+        writer.writerow(_plain(v) for v in row.values())
+        if n == 1 or n % BATCH_SIZE == 0:
+            yield _drain(buffer)
+    yield _drain(buffer)
+
+def ndjson_stream(rows):
+    lines = []
+    for n, row in enumerate(rows, 1):
+        lines.append(json.dumps({k: _plain(v) for k, v in row.items()}) + '\n')
+        if n == 1 or len(lines) == BATCH_SIZE:
+            yield ''.join(lines)
+            lines.clear()
+    yield ''.join(lines)
+
+def export_bookings(owner_id, fmt='csv', **filters):
+    """Generator of text chunks: the owner's bookings as CSV or NDJSON."""
+    stream = csv_stream if fmt == 'csv' else ndjson_stream
+    return stream(iter_booking_rows(owner_id, **filters))
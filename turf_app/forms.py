@@ -1,9 +1,16 @@
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, PasswordField, BooleanField, SubmitField, TextAreaField, FloatField
-from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError, Optional
+from wtforms.validators import DataRequired, Email, InputRequired, Length, EqualTo, ValidationError, Optional
 from .models import User
 
+def check_coordinates(latitude, longitude):
+    """Latitude and longitude must be given together and in range; ValueError otherwise."""
+    if (latitude is None) != (longitude is None):
+        raise ValueError('Give both latitude and longitude, or neither.')
+    if latitude is not None and not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('Latitude must be within ±90 and longitude within ±180.')
+
 class RegisterForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(min=3, max=25)])
     email = StringField('Email', validators=[DataRequired(), Email()])
@@ -33,11 +40,22 @@ class TurfForm(FlaskForm):
     name = StringField('Turf Name', validators=[DataRequired(), Length(max=120)])
     city = StringField('City', validators=[Optional(), Length(max=80)])
     address = StringField('Address', validators=[Optional(), Length(max=200)])
-    price_per_hour = FloatField('Price per Hour', validators=[DataRequired()], default=500.0)
+    price_per_hour = FloatField('Price per Hour', validators=[InputRequired()], default=500.0)
     description = TextAreaField('Description', validators=[Optional()])
+    latitude = FloatField('Latitude', validators=[Optional()])
+    longitude = FloatField('Longitude', validators=[Optional()])
     image = FileField('Turf Image', validators=[FileAllowed(['jpg', 'jpeg', 'png', 'gif'], 'Images only!')])
     submit = SubmitField('Save Turf')
 
+    def validate(self, extra_validators=None):
+        valid = super().validate(extra_validators)
+        try:
+            check_coordinates(self.latitude.data, self.longitude.data)
+        except ValueError as e:
+            self.latitude.errors.append(str(e))
+            return False
+        return valid
+
 class SlotForm(FlaskForm):
     date = StringField('Date', validators=[DataRequired()])
     start_time = StringField('Start Time', validators=[DataRequired()])
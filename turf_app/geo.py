@@ -0,0 +1,136 @@
+import math
+from collections import namedtuple
+from sqlalchemy import column, event, select, table, text
+from . import db
+from .models import Turf
+
+EARTH_RADIUS_KM = 6371.0088
+MAX_RADIUS_KM = 200.0
+MAX_RESULTS = 50
+FIRST_KNN_RADIUS_KM = 2.0
+
+NearbyTurf = namedtuple('NearbyTurf', 'turf distance_km')
+
+# ---------------------------
+# R*TREE INDEX (SQLite)
+# ---------------------------
+# turf_geo is an R*Tree over each located turf's point (a zero-size box);
+# triggers keep it in sync on every insert, update of the coordinates and
+# delete, whichever code path writes turfs. Other backends filter on the
+# (latitude, longitude) B-tree index instead. Either way the index only
+# narrows to a bounding box, and an exact haversine distance decides.
+GEO_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS turf_geo USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+    """CREATE TRIGGER IF NOT EXISTS turf_geo_ai AFTER INSERT ON turf
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+        INSERT INTO turf_geo VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS turf_geo_au AFTER UPDATE OF latitude, longitude ON turf BEGIN
+        DELETE FROM turf_geo WHERE id = old.id;
+        INSERT INTO turf_geo SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+        WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS turf_geo_ad AFTER DELETE ON turf BEGIN
+        DELETE FROM turf_geo WHERE id = old.id;
+    END""",
+]
+
+turf_geo = table('turf_geo', column('id'), column('min_lat'), column('max_lat'),
+                 column('min_lng'), column('max_lng'))
+
+def install_geo_index(connection, rebuild=False):
+    """Create the R*Tree and its triggers if missing; optionally refill it from every located turf."""
+    if connection.dialect.name != 'sqlite':
+        return False
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'turf_geo'")
+    ).first()
+    for statement in GEO_DDL:
+        connection.execute(text(statement))
+    if rebuild or not exists:
+        connection.execute(text("DELETE FROM turf_geo"))
+        connection.execute(text(
+            "INSERT INTO turf_geo SELECT id, latitude, latitude, longitude, longitude FROM turf "
+            "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+        ))
+    return True
+
+@event.listens_for(Turf.__table__, 'after_create')
+def _create_geo_index(target, connection, **kw):
+    install_geo_index(connection)
+
+# ---------------------------
+# DISTANCES
+# ---------------------------
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points, in kilometres."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_box(lat, lng, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) containing every point within radius_km.
+
+    Near a pole, or when the box would cross the antimeridian, longitude is
+    left unbounded rather than split in two.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return min_lat, max_lat, -180.0, 180.0
+    dlng = math.degrees(math.asin(min(1.0, math.sin(math.radians(dlat)) / math.cos(math.radians(lat)))))
+    if lng - dlng < -180.0 or lng + dlng > 180.0:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, lng - dlng, lng + dlng
+
+# ---------------------------
+# NEARBY SEARCH
+# ---------------------------
+def candidates_query(lat, lng, radius_km):
+    """(id, latitude, longitude) of live turfs inside the radius' bounding box."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    query = db.session.query(Turf.id, Turf.latitude, Turf.longitude).filter(Turf.deleted_at.is_(None))
+    if db.engine.dialect.name == 'sqlite':
+        # A subquery, not a join: a join lets SQLite scan turf and probe the R*Tree per row.
+        return query.filter(Turf.id.in_(select(turf_geo.c.id).where(
+            turf_geo.c.max_lat >= min_lat, turf_geo.c.min_lat <= max_lat,
+            turf_geo.c.max_lng >= min_lng, turf_geo.c.min_lng <= max_lng,
+        )))
+    # Portable fallback: a range on the (latitude, longitude) index.
+    return query.filter(Turf.latitude.between(min_lat, max_lat), Turf.longitude.between(min_lng, max_lng))
+
+def _within(lat, lng, radius_km):
+    """Sorted [(distance, turf id)] of live turfs within radius_km: index candidates, exact refinement."""
+    found = []
+    for turf_id, turf_lat, turf_lng in candidates_query(lat, lng, radius_km):
+        distance = haversine_km(lat, lng, turf_lat, turf_lng)
+        if distance <= radius_km:
+            found.append((distance, turf_id))
+    found.sort()
+    return found
+
+def _load(ranked):
+    turfs = {t.id: t for t in Turf.query.filter(Turf.id.in_([turf_id for _, turf_id in ranked]))} \
+        if ranked else {}
+    return [NearbyTurf(turfs[turf_id], round(distance, 2)) for distance, turf_id in ranked if turf_id in turfs]
+
+def turfs_within(lat, lng, radius_km, limit=MAX_RESULTS):
+    """Live turfs within radius_km of a point, nearest first."""
+    radius_km = min(radius_km, MAX_RADIUS_KM)
+    return _load(_within(lat, lng, radius_km)[:limit])
+
+def nearest_turfs(lat, lng, k=10, max_radius_km=MAX_RADIUS_KM):
+    """The k live turfs nearest a point (within max_radius_km), nearest first.
+
+    Searches a small radius and quadruples it until it holds k turfs: every
+    turf outside a radius is farther than every turf inside it, so the
+    first k inside are exactly the k nearest.
+    """
+    k = max(1, min(k, MAX_RESULTS))
+    radius = min(FIRST_KNN_RADIUS_KM, max_radius_km)
+    while True:
+        found = _within(lat, lng, radius)
+        if len(found) >= k or radius >= max_radius_km:
+            return _load(found[:k])
+        radius = min(radius * 4, max_radius_km)
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import tempfile
+from flask import current_app, url_for
+from . import tasks
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional: without it pages fall back to the original upload.
+    Image = ImageOps = None
+
+ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp'}
+CHUNK_SIZE = 64 * 1024
+MEDIA_PREFIX = 'media/'
+
+# name -> (bounding box, crop to fill). Cards are cropped to a fixed aspect,
+# detail images are only shrunk to fit.
+DERIVATIVES = {
+    'card': ((600, 400), True),
+    'detail': ((1200, 900), False),
+}
+
+# ---------------------------
+# CONTENT-ADDRESSED STORAGE
+# ---------------------------
+# Uploads are stored once per distinct content under MEDIA_ROOT as
+# <sha256[:2]>/<sha256>.<ext>, so identical uploads share a file and
+# different files never overwrite each other. Since a name never changes
+# content, media URLs are served with immutable cache headers.
+
+def media_root():
+    return current_app.config['MEDIA_ROOT']
+
+def _extension(filename):
+    ext = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if ext not in ALLOWED_EXTENSIONS:
+        raise ValueError('Images only! Allowed types: ' + ', '.join(sorted(ALLOWED_EXTENSIONS)))
+    return 'jpg' if ext == 'jpeg' else ext
+
+def store_upload(file_storage):
+    """Stream an upload to disk while hashing it; returns the stored path ('media/...')."""
+    ext = _extension(file_storage.filename)
+    root = media_root()
+    os.makedirs(root, exist_ok=True)
+
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=root, prefix='.upload-', delete=False) as tmp:
+        for chunk in iter(lambda: file_storage.stream.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            tmp.write(chunk)
+
+    name = digest.hexdigest()
+    relative = f'{name[:2]}/{name}.{ext}'
+    final = os.path.join(root, relative)
+    if os.path.exists(final):
+        os.remove(tmp.name)  # already stored: deduplicated
+    else:
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        os.replace(tmp.name, final)
+
+    if Image is not None and not all(
+            os.path.exists(os.path.join(root, _derivative_name(relative, size))) for size in DERIVATIVES):
+        tasks.submit(generate_derivatives, root, relative)
+    return MEDIA_PREFIX + relative
+
+def _derivative_name(relative, size):
+    return f'{os.path.splitext(relative)[0]}-{size}.jpg'
+
+def generate_derivatives(root, relative):
+    """Write the card and detail JPEGs for a stored original (runs on the worker pool)."""
+    source = os.path.join(root, relative)
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original).convert('RGB')
+        for size, (box, crop) in DERIVATIVES.items():
+            target = os.path.join(root, _derivative_name(relative, size))
+            if os.path.exists(target):
+                continue
+            image = ImageOps.fit(original, box) if crop else original.copy()
+            if not crop:
+                image.thumbnail(box)
+            tmp = target + '.tmp'
+            image.save(tmp, 'JPEG', quality=82, optimize=True, progressive=True)
+            os.replace(tmp, target)
+
+# ---------------------------
+# URLS
+# ---------------------------
+def image_url(path, size=None):
+    """URL for a turf image, preferring the `size` derivative once it has been generated."""
+    if not path:
+        return None
+    if not path.startswith(MEDIA_PREFIX):
+        return url_for('static', filename=path)  # legacy upload under static/images
+
+    relative = path[len(MEDIA_PREFIX):]
+    if size in DERIVATIVES:
+        derivative = _derivative_name(relative, size)
+        if os.path.exists(os.path.join(media_root(), derivative)):
+            relative = derivative
+    return url_for('main.media', filename=relative)
@@ -0,0 +1,225 @@
+import csv
+import json
+from collections import defaultdict, namedtuple
+from datetime import date, time
+from sqlalchemy import insert
+from werkzeug.datastructures import MultiDict
+from . import db, rollups
+from .cache import invalidate_turf, invalidate_turfs
+from .forms import TurfForm
+from .models import Turf, Slot
+from .schedule import SlotIntervalIndex
+
+IMPORT_KINDS = ('turfs', 'slots')
+IMPORT_FORMATS = ('csv', 'ndjson')
+CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+RowError = namedtuple('RowError', 'line message')
+ImportReport = namedtuple('ImportReport', 'kind created failed errors stopped', defaults=(None,))
+
+# ---------------------------
+# READING
+# ---------------------------
+# Files are read as a stream of rows, one line at a time, so the size of an
+# import is bounded by disk, not memory. Each row is paired with its line
+# number for the error report. A file that turns out to be undecodable or
+# malformed CSV part way through ends the import there: the rows before it
+# are imported as usual and the report says where reading stopped.
+
+def detect_format(filename):
+    return 'ndjson' if (filename or '').lower().endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
+
+def _text_lines(stream):
+    """Decode a binary stream one line at a time, so a bad byte is caught on its own line."""
+    for line_no, raw in enumerate(stream, 1):
+        yield raw.decode('utf-8-sig' if line_no == 1 else 'utf-8')
+
+def read_rows(stream, fmt, stopped):
+    """Yield (line number, dict of strings) from a binary stream; None for unreadable records.
+
+    A line that is not UTF-8, or malformed CSV, ends the rows; the error is
+    appended to `stopped` as a RowError.
+    """
+    lines = _text_lines(stream)
+    line_no = 0
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(lines)
+            for row in reader:
+                yield reader.line_num, {k.strip(): (v or '').strip() for k, v in row.items() if k}
+            return
+        for line_no, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_no, None
+                continue
+            yield line_no, {k: '' if v is None else str(v).strip() for k, v in row.items()} \
+                if isinstance(row, dict) else None
+    except UnicodeDecodeError as e:
+        # The line that failed to decode is the one after the last line read.
+        last = reader.reader.line_num if fmt == 'csv' else line_no
+        stopped.append(RowError(last + 1, f'Not UTF-8 text ({e.reason}).'))
+    except csv.Error as e:
+        stopped.append(RowError(reader.reader.line_num, f'Malformed CSV ({e}).'))
+
+# ---------------------------
+# VALIDATION
+# ---------------------------
+# Turf rows go through TurfForm itself. Slot rows are far more numerous,
+# so they get SlotForm's required fields plus add_slot's checks (valid
+# date and times, start before end, no overlap) without building a form
+# per row.
+
+SLOT_REQUIRED = ('date', 'start_time', 'end_time')  # SlotForm's DataRequired fields
+
+def validate_turf(row):
+    form = TurfForm(formdata=MultiDict(row), meta={'csrf': False})
+    if not form.validate():
+        return None, '; '.join(f'{name}: {", ".join(errors)}' for name, errors in form.errors.items())
+    return {
+        'name': form.name.data, 'city': form.city.data or None, 'address': form.address.data or None,
+        'price_per_hour': form.price_per_hour.data, 'description': form.description.data or None,
+        'latitude': form.latitude.data, 'longitude': form.longitude.data,
+    }, None
+
+def validate_slot(row):
+    missing = [name for name in SLOT_REQUIRED if not row.get(name)]
+    if missing:
+        return None, f'{", ".join(missing)}: This field is required.'
+    try:
+        slot_date = date.fromisoformat(row['date'])
+        start_time = time.fromisoformat(row['start_time'])
+        end_time = time.fromisoformat(row['end_time'])
+    except ValueError:
+        return None, 'Invalid date or time format.'
+    if start_time >= end_time:
+        return None, 'End time must be after start time.'
+    return (slot_date, start_time, end_time), None
+
+# ---------------------------
+# IMPORT
+# ---------------------------
+# Valid rows are written in chunks, each one executemany INSERT in its own
+# transaction. Slot overlaps are checked a chunk at a time against one
+# query for the existing slots of the chunk's turfs and dates, plus the
+# rows accepted before them, so memory is bounded by the chunk size.
+
+class _Importer:
+    """Counts results, keeps the first MAX_REPORTED_ERRORS errors and writes chunks."""
+
+    def __init__(self, model):
+        self.model = model
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(RowError(line, message))
+
+    def write(self, rows):
+        if rows:
+            if self.model is Slot:
+                rollups.slots_added(db.session.execute(insert(Slot).returning(Slot.id), rows).scalars().all())
+            else:
+                db.session.execute(insert(self.model), rows)
+            db.session.commit()
+            self.created += len(rows)
+
+def import_turfs(owner_id, rows, chunk_size=CHUNK_SIZE):
+    importer = _Importer(Turf)
+    pending = []
+    for line, row in rows:
+        values, error = (None, 'Not a valid record.') if row is None else validate_turf(row)
+        if error:
+            importer.fail(line, error)
+            continue
+        values['owner_id'] = owner_id
+        pending.append(values)
+        if len(pending) >= chunk_size:
+            importer.write(pending)
+            pending = []
+    importer.write(pending)
+    if importer.created:
+        invalidate_turfs()
+    return ImportReport('turfs', importer.created, importer.failed, importer.errors)
+
+def _write_slots(importer, pending):
+    """Drop the chunk's rows that overlap existing slots or earlier rows, then insert the rest."""
+    if not pending:
+        return
+    dates = [values[0] for _, _, values in pending]
+    existing = (
+        db.session.query(Slot.turf_id, Slot.date, Slot.start_time, Slot.end_time)
+        .filter(Slot.turf_id.in_({turf_id for _, turf_id, _ in pending}),
+                Slot.date.between(min(dates), max(dates)))
+    )
+    by_turf = defaultdict(list)
+    for turf_id, *interval in existing:
+        by_turf[turf_id].append(interval)
+    indexes = {turf_id: SlotIntervalIndex(intervals) for turf_id, intervals in by_turf.items()}
+
+    accepted = []
+    for line, turf_id, values in pending:
+        index = indexes.get(turf_id)
+        if index is None:
+            index = indexes[turf_id] = SlotIntervalIndex(())
+        if index.overlaps(*values):
+            importer.fail(line, 'Slot overlaps with an existing one.')
+            continue
+        index.add(*values)
+        slot_date, start_time, end_time = values
+        accepted.append({'turf_id': turf_id, 'date': slot_date, 'start_time': start_time, 'end_time': end_time})
+    importer.write(accepted)
+
+def import_slots(owner_id, rows, chunk_size=CHUNK_SIZE):
+    """Slots reference a turf of the owner by `turf_id` or by `turf` (its name)."""
+    turfs = db.session.query(Turf.id, Turf.name).filter(Turf.owner_id == owner_id, Turf.deleted_at.is_(None)).all()
+    turf_ids = {tid for tid, _ in turfs}
+    turf_by_name = {name.casefold(): tid for tid, name in turfs}
+
+    importer = _Importer(Slot)
+    touched = set()
+    pending = []
+    for line, row in rows:
+        if row is None:
+            importer.fail(line, 'Not a valid record.')
+            continue
+        ref = row.get('turf_id') or ''
+        turf_id = int(ref) if ref.isdigit() else turf_by_name.get((row.get('turf') or '').casefold())
+        if turf_id not in turf_ids:
+            importer.fail(line, 'Unknown turf: give the turf_id or name of one of your turfs.')
+            continue
+        values, error = validate_slot(row)
+        if error:
+            importer.fail(line, error)
+            continue
+        touched.add(turf_id)
+        pending.append((line, turf_id, values))
+        if len(pending) >= chunk_size:
+            _write_slots(importer, pending)
+            pending = []
+    _write_slots(importer, pending)
+    for turf_id in touched:
+        invalidate_turf(turf_id)
+    return ImportReport('slots', importer.created, importer.failed, importer.errors)
+
+def bulk_import(owner_id, kind, stream, fmt='csv', chunk_size=CHUNK_SIZE):
+    """Stream-import turfs or slots for an owner; returns an ImportReport.
+
+    Rows are committed a chunk at a time, so if the file cannot be read to
+    the end the rows before that point stay imported and `stopped` says
+    where reading stopped.
+    """
+    stopped = []
+    rows = read_rows(stream, fmt, stopped)
+    if kind == 'turfs':
+        report = import_turfs(owner_id, rows, chunk_size)
+    else:
+        report = import_slots(owner_id, rows, chunk_size)
+    return report._replace(stopped=stopped[0] if stopped else None)
@@ -0,0 +1,144 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+# ---------------------------
+# STRUCTURED, NON-BLOCKING LOGGING
+# ---------------------------
+# Request threads only put records on a bounded in-memory queue; one
+# listener thread per log file formats them as JSON lines and writes them
+# to a rotating file. When the queue is full, records are dropped and
+# counted instead of blocking the request. Setup is idempotent: however
+# many apps are created in a process, each log file gets one listener and
+# app.logger (shared by every app in the process) one queue handler.
+
+_pipelines = {}  # log file -> BoundedQueueHandler
+_lock = threading.Lock()
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the request fields captured at log time."""
+
+    FIELDS = ('request_id', 'method', 'path', 'endpoint', 'status', 'duration_ms')
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: a full queue drops the record."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Capture request fields on the request thread, before the record
+        # crosses to the listener thread where the request is gone. Work on
+        # a copy: other handlers still get the caller's record untouched.
+        record = copy.copy(record)
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.method = request.method
+            record.path = request.path
+            record.endpoint = request.endpoint
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def _file_handler(config):
+    path = config['LOG_FILE']
+    if config.get('LOG_ROTATE_WHEN'):
+        handler = TimedRotatingFileHandler(path, when=config['LOG_ROTATE_WHEN'],
+                                           backupCount=config.get('LOG_BACKUP_COUNT', 5),
+                                           encoding='utf-8', delay=True)
+    else:
+        handler = RotatingFileHandler(path, maxBytes=config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+                                      backupCount=config.get('LOG_BACKUP_COUNT', 5),
+                                      encoding='utf-8', delay=True)
+    handler.setFormatter(JsonFormatter())
+    # The handler opens the file lazily, on the listener thread; fail here instead.
+    open(path, 'a', encoding='utf-8').close()
+    return handler
+
+def _pipeline(config):
+    path = config['LOG_FILE']
+    with _lock:
+        handler = _pipelines.get(path)
+        if handler is None:
+            file_handler = _file_handler(config)
+            handler = BoundedQueueHandler(queue.Queue(maxsize=config.get('LOG_QUEUE_SIZE', 10000)))
+            listener = QueueListener(handler.queue, file_handler, respect_handler_level=True)
+            listener.start()
+            atexit.register(listener.stop)
+            _pipelines[path] = handler
+    return handler
+
+def dropped_records():
+    return sum(handler.dropped for handler in _pipelines.values())
+
+def init_logging(app):
+    app.logger.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+    handler = None
+    if app.config.get('LOG_FILE'):
+        try:
+            handler = _pipeline(app.config)
+        except OSError as e:
+            # Keep (or restore) Flask's stderr handler so errors still go somewhere.
+            if default_handler not in app.logger.handlers:
+                app.logger.addHandler(default_handler)
+            app.logger.error(f'Could not open log file {app.config["LOG_FILE"]}, logging to stderr: {e}')
+    if handler is not None:
+        for existing in list(app.logger.handlers):
+            if isinstance(existing, BoundedQueueHandler) and existing is not handler:
+                app.logger.removeHandler(existing)
+        if handler not in app.logger.handlers:
+            app.logger.addHandler(handler)
+        if not app.debug:  # Flask's stderr handler would write on the request thread
+            app.logger.removeHandler(default_handler)
+
+    @app.before_request
+    def start_request_log():
+        g.request_id = request.headers.get('X-Request-ID', '')[:64] or uuid.uuid4().hex
+        g.log_started = time.perf_counter()
+
+    @app.after_request
+    def finish_request_log(response):
+        response.headers['X-Request-ID'] = g.get('request_id', '')
+        if app.config.get('LOG_REQUESTS', True) and 'log_started' in g:
+            app.logger.info('request', extra={
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - g.log_started) * 1000, 2),
+            })
+        return response
@@ -1,74 +1,238 @@
 from flask import (
     Blueprint, render_template, request, redirect,
-    url_for, flash, abort, jsonify, current_app
+    url_for, flash, abort, jsonify, current_app, send_from_directory, stream_with_context
 )
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
-from .models import Turf, Slot, Booking
-from . import db
+from .models import Turf, Slot, Booking, BookingArchive
+from .forms import check_coordinates
+from .bookings import claim_slot, release_booking
+from .analytics import owner_stats
+from .search import search_turfs
+from .slotsearch import find_available
+from .geo import MAX_RADIUS_KM, nearest_turfs, turfs_within
+from .availability import availability_bitmaps, free_slots_by_day, window
+from .schedule import generate_slots
+from .querybudget import query_budget
+from .cache import cached_page, invalidate_turf, invalidate_turfs
+from .images import media_root, store_upload
+from .exports import EXPORT_FORMATS, export_bookings
+from .imports import IMPORT_KINDS, bulk_import, detect_format
+from .pagination import DEFAULT_PER_PAGE, clamp_per_page, keyset_merged_page, keyset_page, page_meta
+from . import db, deletion, queries, rollups
 from datetime import datetime, date, time
-import os
+import math
 
 main_bp = Blueprint('main', __name__, template_folder='templates')
 
+MEDIA_MAX_AGE = 365 * 24 * 3600
+
+# ---------------------------
+# REQUEST HELPERS
+# ---------------------------
+def wants_json():
+    return request.args.get('format') == 'json'
+
+def wants_archived():
+    """History views include archived slots and bookings only when asked (?archived=1)."""
+    return request.args.get('archived') == '1'
+
+def page_args(default_per_page=DEFAULT_PER_PAGE):
+    """Keyset paging arguments (after/before cursors, clamped per_page) from the query string."""
+    return {
+        'after': request.args.get('after'),
+        'before': request.args.get('before'),
+        'per_page': clamp_per_page(request.args.get('per_page', type=int), default_per_page),
+    }
+
+def date_arg(name):
+    """Optional ISO date from the query string; a malformed one is a 400."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        abort(400)
+
+def time_arg(name):
+    """Optional HH:MM time from the query string; a malformed one is a 400."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%H:%M").time()
+    except ValueError:
+        abort(400)
+
+def float_arg(name):
+    """Optional number from the query string; a malformed or non-finite one is a 400."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        abort(400)
+    if not math.isfinite(number):
+        abort(400)
+    return number
+
+def form_coordinates():
+    """(latitude, longitude) from a turf form, checked like TurfForm's; ValueError otherwise."""
+    lat, lng = request.form.get('latitude', '').strip(), request.form.get('longitude', '').strip()
+    lat, lng = float(lat) if lat else None, float(lng) if lng else None
+    check_coordinates(lat, lng)
+    return lat, lng
+
+def window_args():
+    """Availability window (start date, number of days) from the query string."""
+    try:
+        start = date.fromisoformat(request.args['start'])
+    except (KeyError, ValueError):
+        start = None
+    return start, request.args.get('days', type=int)
+
 # ---------------------------
 # HOME & TURF LISTING
 # ---------------------------
 @main_bp.route('/')
+@cached_page('turfs')
+@query_budget(2)
 def index():
     """Homepage: show latest turfs."""
-    turfs = Turf.query.order_by(Turf.created_at.desc()).limit(6).all()
-    return render_template('index.html', turfs=turfs)
+    page = keyset_page(queries.all_turfs(), Turf, **page_args(6))
+    if wants_json():
+        return jsonify(turfs=[t.to_dict() for t in page.items], **page_meta(page))
+    return render_template('index.html', turfs=page.items, page=page)
 
 @main_bp.route('/turfs')
+@cached_page('turfs')
+@query_budget(2)
 def turf_list():
-    """Browse turfs, optionally filtered by city."""
+    """Browse turfs, optionally filtered by city or full-text searched."""
     city = request.args.get('city', '')
-    if city:
-        turfs = Turf.query.filter(Turf.city.ilike(f'%{city}%')).all()
+    q = request.args.get('q', '').strip()
+    results = page = None
+    if q:
+        results = search_turfs(q, page=request.args.get('page', 1, type=int), city=city)
+        turfs = results.turfs
     else:
-        turfs = Turf.query.all()
-    return render_template('turf_list.html', turfs=turfs, city=city)
+        query = queries.turfs_by_city(city) if city else queries.all_turfs()
+        page = keyset_page(query, Turf, **page_args())
+        turfs = page.items
+    if wants_json():
+        meta = page_meta(page) if page else {'page': results.page, 'has_next': results.has_next}
+        return jsonify(turfs=[t.to_dict() for t in turfs], **meta)
+    return render_template('turf_list.html', turfs=turfs, city=city, q=q, results=results, page=page)
+
+@main_bp.route('/turfs/available')
+@query_budget(3)
+def available_turfs():
+    """Turfs with a free slot on a day, inside a time window, under a price; ranked and paginated."""
+    city = request.args.get('city', '').strip()
+    day = date_arg('date') or date.today()
+    start, end = time_arg('start'), time_arg('end')
+    max_price = float_arg('max_price')
+    results = find_available(city, day, start, end, max_price,
+                             page=request.args.get('page', 1, type=int),
+                             per_page=request.args.get('per_page', 12, type=int))
+    if wants_json():
+        return jsonify(
+            date=results.day.isoformat(),
+            page=results.page,
+            has_next=results.has_next,
+            turfs=[dict(r.turf.to_dict(), free_slots=[
+                {'id': s.id, 'start': s.start_time.strftime('%H:%M'), 'end': s.end_time.strftime('%H:%M')}
+                for s in r.slots
+            ]) for r in results.results],
+        )
+    return render_template('available_turfs.html', results=results, city=city, start=start, end=end,
+                           max_price=max_price)
+
+@main_bp.route('/turfs/nearby')
+@cached_page('turfs')
+@query_budget(6)
+def nearby_turfs():
+    """Turfs near a point: within radius_km when given, else the k nearest; nearest first."""
+    lat, lng = float_arg('lat'), float_arg('lng')
+    radius_km, k = float_arg('radius_km'), request.args.get('k', 10, type=int)
+    if lat is not None and not (-90 <= lat <= 90) or lng is not None and not (-180 <= lng <= 180):
+        abort(400)
+    results = []
+    if lat is not None and lng is not None:
+        results = turfs_within(lat, lng, radius_km) if radius_km else nearest_turfs(lat, lng, k)
+    if wants_json():
+        return jsonify(turfs=[dict(r.turf.to_dict(), distance_km=r.distance_km) for r in results])
+    return render_template('nearby_turfs.html', results=results, lat=lat, lng=lng, radius_km=radius_km, k=k,
+                           max_radius_km=MAX_RADIUS_KM)
 
 @main_bp.route('/turf/<int:turf_id>')
+@cached_page('turf:{turf_id}')
+@query_budget(3)
 def turf_details(turf_id):
-    """Show turf info and available slots."""
-    turf = Turf.query.get_or_404(turf_id)
-    slots = Slot.query.filter_by(turf_id=turf_id).order_by(Slot.date, Slot.start_time).all()
-    return render_template('turf_details.html', turf=turf, slots=slots)
+    """Show turf info and free slots in the availability window (the coming week by default)."""
+    turf = queries.turf(turf_id).first_or_404()
+    start, end = window(*window_args())
+    window_days = (end - start).days + 1
+    days = free_slots_by_day(turf_id, start, window_days)
+    return render_template('turf_details.html', turf=turf, days=days, window_start=start, window_days=window_days)
+
+@main_bp.route('/turf/<int:turf_id>/availability')
+@cached_page('turf:{turf_id}')
+@query_budget(2)
+def turf_availability(turf_id):
+    """JSON availability for polling: free slots plus a per-day free/booked bitmap."""
+    if not queries.turf(turf_id).with_entities(Turf.id).first():
+        abort(404)
+    start, end, days = availability_bitmaps(turf_id, *window_args())
+    response = jsonify(
+        turf_id=turf_id,
+        start=start.isoformat(),
+        end=end.isoformat(),
+        days=[{
+            'date': day.date.isoformat(),
+            'bitmap': day.bitmap,
+            'free': [
+                {'id': s.id, 'start': s.start_time.strftime('%H:%M'), 'end': s.end_time.strftime('%H:%M')}
+                for s in day.slots
+            ],
+        } for day in days],
+    )
+    response.add_etag()
+    return response.make_conditional(request)
 
 # ---------------------------
 # PLAYER BOOKING
 # ---------------------------
 @main_bp.route('/book/<int:slot_id>', methods=['POST'])
+@query_budget(5)
 @login_required
 def book_slot(slot_id):
     """Book an available slot."""
     slot = Slot.query.get_or_404(slot_id)
-    if slot.is_booked:
-        flash('Slot already booked. Please choose another one.', 'warning')
+    if slot.is_booked or claim_slot(slot.id, current_user.id) is None:
+        flash('Slot is already booked or has started. Please choose another one.', 'warning')
         return redirect(url_for('main.turf_details', turf_id=slot.turf_id))
 
-    booking = Booking(user_id=current_user.id, turf_id=slot.turf_id, slot_id=slot.id)
-    slot.is_booked = True
-    db.session.add(booking)
-    db.session.commit()
-
     flash('✅ Booking confirmed successfully!', 'success')
     return redirect(url_for('main.booking_history'))
 
 @main_bp.route('/my-bookings')
+@query_budget(3)
 @login_required
 def booking_history():
-    """Player's past and current bookings."""
-    bookings = (
-        Booking.query.filter_by(user_id=current_user.id)
-        .order_by(Booking.created_at.desc())
-        .all()
-    )
-    return render_template('booking_history.html', bookings=bookings)
+    """Player's past and current bookings; ?archived=1 includes the archived ones."""
+    sources = [(queries.user_bookings(current_user.id), Booking)]
+    archived = wants_archived()
+    if archived:
+        sources.append((queries.user_archived_bookings(current_user.id), BookingArchive))
+    page = keyset_merged_page(sources, **page_args())
+    if wants_json():
+        return jsonify(bookings=[b.to_dict() for b in page.items], **page_meta(page))
+    return render_template('booking_history.html', bookings=page.items, page=page, archived=archived)
 
 @main_bp.route('/cancel-booking/<int:booking_id>', methods=['POST'])
+@query_budget(4)
 @login_required
 def cancel_booking(booking_id):
     """Cancel a booking and free the slot."""
@@ -76,13 +240,9 @@ def cancel_booking(booking_id):
     if booking.user_id != current_user.id:
         abort(403)
     
-    # Free up the slot
-    slot = Slot.query.get(booking.slot_id)
-    if slot:
-        slot.is_booked = False
-    
-    booking.status = 'cancelled'
-    db.session.commit()
+    if not release_booking(booking.id):
+        flash('Booking is already cancelled.', 'info')
+        return redirect(url_for('main.booking_history'))
     
     flash('Booking cancelled successfully.', 'info')
     return redirect(url_for('main.booking_history'))
@@ -91,29 +251,102 @@ def cancel_booking(booking_id):
 # OWNER DASHBOARD & MANAGEMENT
 # ---------------------------
 @main_bp.route('/owner/dashboard')
+@query_budget(3)
 @login_required
 def owner_dashboard():
-    """Dashboard for turf owners."""
+    """Dashboard for turf owners; ?archived=1 adds archived slots and bookings to the analytics."""
     if not current_user.is_owner:
         abort(403)
 
-    turfs = Turf.query.filter_by(owner_id=current_user.id).all()
-    
-    # Analytics: revenue, utilization, total bookings
-    total_revenue = sum(turf.total_revenue() for turf in turfs)
-    total_bookings = sum(len([b for b in turf.bookings if b.status == 'confirmed']) for turf in turfs)
-    total_slots = sum(len(turf.slots) for turf in turfs)
-    utilization = round((total_bookings / total_slots * 100), 1) if total_slots else 0
+    # Analytics: revenue, utilization, total bookings in one grouped query (plus one for the archive)
+    archived = wants_archived()
+    stats = owner_stats(current_user.id, include_archived=archived)
 
     return render_template(
         'dashboard.html',
-        turfs=turfs,
-        total_revenue=total_revenue,
-        total_bookings=total_bookings,
-        utilization=utilization,
+        turfs=[t.turf for t in stats.turfs],
+        turf_stats=stats.turfs,
+        total_revenue=stats.total_revenue,
+        total_bookings=stats.total_bookings,
+        utilization=stats.utilization,
+        archived=archived,
     )
 
+@main_bp.route('/owner/reports')
+@query_budget(3)
+@login_required
+def owner_reports():
+    """Revenue and occupancy per day, week or month, and a peak-hour heatmap, read from the rollups."""
+    if not current_user.is_owner:
+        abort(403)
+    granularity = request.args.get('by', 'day')
+    if granularity not in rollups.GRANULARITIES:
+        abort(400)
+    start, end = rollups.default_report_range()
+    start, end = date_arg('start') or start, date_arg('end') or end
+    if end < start:
+        abort(400)
+    turfs = queries.all_turfs().filter(Turf.owner_id == current_user.id).with_entities(Turf.id, Turf.name).all()
+    turf_id = request.args.get('turf', type=int)
+    if turf_id is not None and turf_id not in {t.id for t in turfs}:
+        abort(404)
+
+    report = rollups.rollup_report(current_user.id, start, end, turf_id, granularity)
+    if wants_json():
+        return jsonify(
+            start=report.start.isoformat(),
+            end=report.end.isoformat(),
+            granularity=report.granularity,
+            turf_id=turf_id,
+            totals=report.totals._asdict(),
+            series=[dict(p._asdict(), period=p.period.isoformat()) for p in report.series],
+            heatmap=report.heatmap,
+        )
+    return render_template('reports.html', report=report, turfs=turfs, turf_id=turf_id)
+
+@main_bp.route('/owner/bookings/export')
+@query_budget(2)
+@login_required
+def export_owner_bookings():
+    """Stream every booking on the owner's turfs as CSV or NDJSON (?format, start, end, status)."""
+    if not current_user.is_owner:
+        abort(403)
+    fmt = request.args.get('format', 'csv')
+    status = request.args.get('status') or None
+    if fmt not in EXPORT_FORMATS or status not in (None, 'confirmed', 'cancelled'):
+        abort(400)
+
+    chunks = export_bookings(current_user.id, fmt, start=date_arg('start'), end=date_arg('end'), status=status)
+    response = current_app.response_class(stream_with_context(chunks), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename=bookings-{date.today()}.{fmt}'
+    return response
+
+@main_bp.route('/owner/import', methods=['GET', 'POST'])
+@login_required
+def bulk_import_view():
+    """Upload a CSV/NDJSON file of turfs or slots; shows a per-row error report."""
+    if not current_user.is_owner:
+        abort(403)
+
+    report = None
+    if request.method == 'POST':
+        kind = request.form.get('kind')
+        upload = request.files.get('file')
+        if kind not in IMPORT_KINDS or not upload or not upload.filename:
+            flash('Choose what to import and a file.', 'danger')
+            return redirect(url_for('main.bulk_import_view'))
+        report = bulk_import(current_user.id, kind, upload.stream, detect_format(upload.filename))
+        if report.stopped:
+            flash(f'Stopped reading at line {report.stopped.line}: {report.stopped.message} Imported '
+                  f'{report.created} {kind} from the lines before it; {report.failed} row(s) rejected.', 'danger')
+        else:
+            flash(f'Imported {report.created} {kind}; {report.failed} row(s) rejected.',
+                  'success' if not report.failed else 'warning')
+
+    return render_template('bulk_import.html', report=report)
+
 @main_bp.route('/owner/add-turf', methods=['GET', 'POST'])
+@query_budget(3)
 @login_required
 def add_turf():
     """Add a new turf listing."""
@@ -127,6 +360,7 @@ def add_turf():
             address = request.form.get('address')
             price = float(request.form.get('price') or 500.0)
             desc = request.form.get('description')
+            latitude, longitude = form_coordinates()
             image_file = request.files.get('image')
 
             # Validate required fields
@@ -136,11 +370,7 @@ def add_turf():
 
             image_path = None
             if image_file and image_file.filename:
-                filename = secure_filename(image_file.filename)
-                upload_folder = os.path.join(current_app.root_path, 'static', 'images')
-                os.makedirs(upload_folder, exist_ok=True)
-                image_path = os.path.join('images', filename)
-                image_file.save(os.path.join(upload_folder, filename))
+                image_path = store_upload(image_file)
 
             turf = Turf(
                 owner_id=current_user.id,
@@ -150,9 +380,12 @@ def add_turf():
                 price_per_hour=price,
                 description=desc,
                 image=image_path,
+                latitude=latitude,
+                longitude=longitude,
             )
             db.session.add(turf)
             db.session.commit()
+            invalidate_turfs()
 
             flash('✅ Turf added successfully!', 'success')
             return redirect(url_for('main.owner_dashboard'))
@@ -162,15 +395,17 @@ def add_turf():
     return render_template('add_turf.html')
 
 @main_bp.route('/owner/turf/<int:turf_id>/edit', methods=['GET', 'POST'])
+@query_budget(3)
 @login_required
 def edit_turf(turf_id):
     """Edit existing turf."""
-    turf = Turf.query.get_or_404(turf_id)
+    turf = queries.turf(turf_id).first_or_404()
     if turf.owner_id != current_user.id:
         abort(403)
 
     if request.method == 'POST':
         try:
+            turf.latitude, turf.longitude = form_coordinates()
             turf.name = request.form.get('name')
             turf.city = request.form.get('city')
             turf.address = request.form.get('address')
@@ -180,14 +415,11 @@ def edit_turf(turf_id):
             # Handle image upload
             image_file = request.files.get('image')
             if image_file and image_file.filename:
-                filename = secure_filename(image_file.filename)
-                upload_folder = os.path.join(current_app.root_path, 'static', 'images')
-                os.makedirs(upload_folder, exist_ok=True)
-                image_path = os.path.join('images', filename)
-                image_file.save(os.path.join(upload_folder, filename))
-                turf.image = image_path
+                turf.image = store_upload(image_file)
             
             db.session.commit()
+            invalidate_turfs()
+            invalidate_turf(turf_id)
             flash('✅ Turf updated successfully!', 'success')
             return redirect(url_for('main.owner_dashboard'))
         except Exception as e:
@@ -196,16 +428,18 @@ def edit_turf(turf_id):
     return render_template('edit_turf.html', turf=turf)
 
 @main_bp.route('/owner/turf/<int:turf_id>/delete', methods=['POST'])
+@query_budget(3)
 @login_required
 def delete_turf(turf_id):
-    """Delete a turf."""
-    turf = Turf.query.get_or_404(turf_id)
-    if turf.owner_id != current_user.id:
+    """Delete a turf (its slots and bookings go by cascade, or in the background when soft-deleting)."""
+    owner_id = queries.turf(turf_id).with_entities(Turf.owner_id).scalar()
+    if owner_id is None:
+        abort(404)
+    if owner_id != current_user.id:
         abort(403)
     
     try:
-        db.session.delete(turf)
-        db.session.commit()
+        deletion.remove_turf(turf_id)
         flash('❌ Turf deleted successfully.', 'info')
     except Exception as e:
         flash(f'Error deleting turf: {str(e)}', 'danger')
@@ -216,10 +450,11 @@ def delete_turf(turf_id):
 # SLOT MANAGEMENT
 # ---------------------------
 @main_bp.route('/owner/turf/<int:turf_id>/add-slot', methods=['GET', 'POST'])
+@query_budget(4)
 @login_required
 def add_slot(turf_id):
     """Add an available slot for a turf."""
-    turf = Turf.query.get_or_404(turf_id)
+    turf = queries.turf(turf_id).first_or_404()
     if turf.owner_id != current_user.id:
         abort(403)
 
@@ -243,10 +478,9 @@ def add_slot(turf_id):
                 return redirect(url_for('main.add_slot', turf_id=turf.id))
 
             # Prevent overlap
-            for s in turf.slots:
-                if s.date == slot_date and s.overlaps_with(start_time, end_time):
-                    flash('⚠️ Slot overlaps with an existing one.', 'warning')
-                    return redirect(url_for('main.add_slot', turf_id=turf.id))
+            if queries.overlapping_slot(turf.id, slot_date, start_time, end_time).first():
+                flash('⚠️ Slot overlaps with an existing one.', 'warning')
+                return redirect(url_for('main.add_slot', turf_id=turf.id))
 
             new_slot = Slot(
                 turf_id=turf.id, 
@@ -255,7 +489,10 @@ def add_slot(turf_id):
                 end_time=end_time
             )
             db.session.add(new_slot)
+            db.session.flush()
+            rollups.slots_added([new_slot.id])
             db.session.commit()
+            invalidate_turf(turf_id)
             flash('✅ Slot added successfully!', 'success')
             return redirect(url_for('main.owner_dashboard'))
 
@@ -266,19 +503,70 @@ def add_slot(turf_id):
 
     return render_template('add_slot.html', turf=turf)
 
+@main_bp.route('/owner/turf/<int:turf_id>/add-schedule', methods=['GET', 'POST'])
+@query_budget(24)
+@login_required
+def add_schedule(turf_id):
+    """Publish a recurring schedule of slots for a turf in one go."""
+    turf = queries.turf(turf_id).first_or_404()
+    if turf.owner_id != current_user.id:
+        abort(403)
+
+    if request.method == 'POST':
+        try:
+            start_date = datetime.strptime(request.form.get('start_date', ''), "%Y-%m-%d").date()
+            end_date = datetime.strptime(request.form.get('end_date', ''), "%Y-%m-%d").date()
+            open_time = datetime.strptime(request.form.get('open_time', ''), "%H:%M").time()
+            close_time = datetime.strptime(request.form.get('close_time', ''), "%H:%M").time()
+            slot_minutes = int(request.form.get('slot_minutes') or 60)
+            weekdays = {int(d) for d in request.form.getlist('weekdays')}
+            excluded = {
+                datetime.strptime(d, "%Y-%m-%d").date()
+                for d in request.form.get('excluded_dates', '').replace(',', ' ').split()
+            }
+
+            if not weekdays:
+                flash('Pick at least one day of the week.', 'danger')
+                return redirect(url_for('main.add_schedule', turf_id=turf.id))
+
+            result = generate_slots(turf.id, start_date, end_date, weekdays,
+                                    open_time, close_time, slot_minutes, excluded)
+            invalidate_turf(turf_id)
+            flash(f'✅ {result.created} slot(s) created, {result.skipped} skipped as overlapping.', 'success')
+            return redirect(url_for('main.owner_dashboard'))
+
+        except ValueError as e:
+            flash(f'Invalid schedule: {e}', 'danger')
+        except Exception as e:
+            flash(f'Error creating schedule: {str(e)}', 'danger')
+
+    return render_template('add_schedule.html', turf=turf)
+
 @main_bp.route('/owner/slot/<int:slot_id>/delete', methods=['POST'])
+@query_budget(3)
 @login_required
 def delete_slot(slot_id):
-    """Delete a specific slot."""
-    slot = Slot.query.get_or_404(slot_id)
-    if slot.turf.owner_id != current_user.id:
+    """Delete a specific slot (and, by cascade, its bookings)."""
+    turf_id, owner_id = queries.slot_owner(slot_id).first_or_404()
+    if owner_id != current_user.id:
         abort(403)
     
     try:
-        db.session.delete(slot)
-        db.session.commit()
+        deletion.delete_slot(slot_id)
+        invalidate_turf(turf_id)
         flash('❌ Slot deleted successfully.', 'info')
     except Exception as e:
         flash(f'Error deleting slot: {str(e)}', 'danger')
     
-    return redirect(url_for('main.owner_dashboard'))
\ No newline at end of file
+    return redirect(url_for('main.owner_dashboard'))
+
+# ---------------------------
+# MEDIA
+# ---------------------------
+@main_bp.route('/media/<path:filename>')
+def media(filename):
+    """Serve content-addressed uploads; their names never change content, so cache forever."""
+    response = send_from_directory(media_root(), filename, max_age=MEDIA_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,189 @@
+import bisect
+import cProfile
+import os
+import threading
+import time
+from datetime import datetime
+from flask import before_render_template, g, request, template_rendered
+from .cache import page_cache, user_cache
+from .logs import dropped_records
+from .querybudget import start_counting, statement_count, statement_seconds
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+SIZE_BUCKETS = (512, 2048, 8192, 32768, 131072, 524288, 2097152)
+
+# ---------------------------
+# METRIC TYPES
+# ---------------------------
+# Kept in process memory and exposed in the Prometheus text format, so each
+# worker reports its own series; Prometheus aggregates across workers.
+
+def _labels(names, values):
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+
+class Histogram:
+    """Bucketed observations per label set."""
+
+    def __init__(self, name, help, buckets, labels=('endpoint',)):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self._series = {}  # label values -> [count per bucket..., count above last, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for label_values, values in series:
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {values[-1]}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+class Counter:
+    """Monotonic count per label set."""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            series = sorted(self._series.items())
+        for label_values, value in series:
+            labels = _labels(self.labels, label_values)
+            lines.append(f'{self.name}{{{labels}}} {value}' if labels else f'{self.name} {value}')
+        return lines
+
+def _gauges(name, help, stats):
+    lines = [f'# HELP {name} {help}', f'# TYPE {name} gauge']
+    lines.extend(f'{name}{{stat="{key}"}} {value}' for key, value in sorted(stats.items()))
+    return lines
+
+# ---------------------------
+# REQUEST METRICS
+# ---------------------------
+REQUESTS = Counter('turfease_requests_total', 'Requests served.', ('endpoint', 'method', 'status'))
+LATENCY = Histogram('turfease_request_duration_seconds', 'Time to build a response.', LATENCY_BUCKETS)
+SQL_STATEMENTS = Histogram('turfease_request_sql_statements', 'SQL statements run per request.',
+                           STATEMENT_BUCKETS)
+SQL_SECONDS = Histogram('turfease_request_sql_seconds', 'Time spent in SQL per request.', LATENCY_BUCKETS)
+TEMPLATE_SECONDS = Histogram('turfease_request_template_seconds', 'Time spent rendering templates per request.',
+                             LATENCY_BUCKETS)
+RESPONSE_BYTES = Histogram('turfease_response_size_bytes', 'Response body size (before compression).',
+                           SIZE_BUCKETS)
+
+REQUEST_METRICS = (REQUESTS, LATENCY, SQL_STATEMENTS, SQL_SECONDS, TEMPLATE_SECONDS, RESPONSE_BYTES)
+
+def render_metrics():
+    lines = []
+    for metric in REQUEST_METRICS:
+        lines.extend(metric.expose())
+    lines.extend(_gauges('turfease_page_cache', 'Public page cache counters.', page_cache.stats()))
+    lines.extend(_gauges('turfease_user_cache', 'User identity cache counters.', user_cache.stats()))
+    lines.extend(['# HELP turfease_log_dropped_records_total Log records dropped on a full log queue.',
+                  '# TYPE turfease_log_dropped_records_total counter',
+                  f'turfease_log_dropped_records_total {dropped_records()}'])
+    return '\n'.join(lines) + '\n'
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.template_seconds = 0.0
+    start_counting()
+
+def _record_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    LATENCY.observe(time.perf_counter() - started, endpoint)
+    REQUESTS.inc(endpoint, request.method, str(response.status_code))
+    SQL_STATEMENTS.observe(statement_count(), endpoint)
+    SQL_SECONDS.observe(statement_seconds(), endpoint)
+    TEMPLATE_SECONDS.observe(g.get('template_seconds', 0.0), endpoint)
+    if not response.is_streamed:
+        RESPONSE_BYTES.observe(response.calculate_content_length() or 0, endpoint)
+    return response
+
+def _template_started(sender, template, context, **extra):
+    g.setdefault('template_stack', []).append(time.perf_counter())
+
+def _template_finished(sender, template, context, **extra):
+    stack = g.get('template_stack')
+    if stack:
+        elapsed = time.perf_counter() - stack.pop()
+        if not stack:  # nested renders are already inside the outer one
+            g.template_seconds = g.get('template_seconds', 0.0) + elapsed
+
+# ---------------------------
+# OPT-IN PROFILER
+# ---------------------------
+# PROFILE_REQUESTS profiles every request; with PROFILER_ENABLED a request
+# can ask for it with an `X-Profile: 1` header. Each profile is dumped to
+# PROFILE_DIR as <endpoint>-<timestamp>.prof (open with pstats or snakeviz)
+# and its file name is returned in X-Profile-File.
+
+def _wants_profile(app):
+    return app.config.get('PROFILE_REQUESTS') or (
+        app.config.get('PROFILER_ENABLED') and request.headers.get('X-Profile') == '1')
+
+def init_metrics(app):
+    if app.config.get('METRICS_ENABLED', True):
+        app.before_request(_start_request)
+        app.after_request(_record_request)
+        before_render_template.connect(_template_started, app)
+        template_rendered.connect(_template_finished, app)
+
+        @app.route('/metrics')
+        def metrics():
+            return app.response_class(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    if app.config.get('PROFILE_REQUESTS') or app.config.get('PROFILER_ENABLED'):
+        init_profiler(app)
+
+def init_profiler(app):
+    profile_dir = app.config['PROFILE_DIR']
+
+    @app.before_request
+    def start_profile():
+        if _wants_profile(app):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # another request's profiler is active on this interpreter
+                return
+            g.profiler = profiler
+
+    @app.after_request
+    def dump_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(profile_dir, exist_ok=True)
+            name = f'{request.endpoint or "unmatched"}-{datetime.utcnow():%Y%m%dT%H%M%S%f}.prof'
+            profiler.dump_stats(os.path.join(profile_dir, name))
+            response.headers['X-Profile-File'] = name
+        return response
@@ -1,8 +1,11 @@
 from . import db, login_manager
+from .cache import invalidate_user, user_cache
 from flask_login import UserMixin
+from collections import namedtuple
 from datetime import datetime, date, time
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import func
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
 
 # ---------------------------
 # USER MODEL
@@ -36,9 +39,35 @@ class User(db.Model, UserMixin):
             'is_owner': self.is_owner,
         }
 
+class UserIdentity(namedtuple('UserIdentity', 'id username is_owner'), UserMixin):
+    """Detached, read-only snapshot of a user; what current_user is between requests."""
+    __slots__ = ()
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    identity = user_cache.get(user_id)
+    if identity is None:
+        row = db.session.execute(
+            select(User.id, User.username, User.is_owner).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        identity = UserIdentity(row.id, row.username, bool(row.is_owner))
+        user_cache.set(user_id, identity)
+    return identity
+
+# A change is only dropped from the cache once committed: dropped at flush,
+# a request could load and cache the old row again before the commit.
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    object_session(target).info.setdefault('changed_users', set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop('changed_users', ()):
+        invalidate_user(user_id)
 
 # ---------------------------
 # TURF MODEL
@@ -52,44 +81,88 @@ class Turf(db.Model):
     price_per_hour = db.Column(db.Float, nullable=False, default=500.0)
     description = db.Column(db.Text)
     image = db.Column(db.String(200))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = db.Column(db.DateTime)  # soft-deleted: hidden now, rows reclaimed in the background
 
-    # Relationships
+    __table_args__ = (
+        db.Index('ix_turf_owner', 'owner_id'),
+        db.Index('ix_turf_created', 'created_at'),
+        db.Index('ix_turf_deleted', 'deleted_at',
+                 sqlite_where=db.text('deleted_at IS NOT NULL'),
+                 postgresql_where=db.text('deleted_at IS NOT NULL')),
+    )
+
+    # Relationships (slots and bookings are removed by ON DELETE CASCADE, not loaded first)
     owner = db.relationship('User', back_populates='turfs')
-    slots = db.relationship('Slot', back_populates='turf', lazy=True, cascade='all, delete-orphan')
-    bookings = db.relationship('Booking', back_populates='turf', lazy=True, cascade='all, delete-orphan')
+    slots = db.relationship('Slot', back_populates='turf', lazy=True, cascade='all, delete-orphan',
+                            passive_deletes=True)
+    bookings = db.relationship('Booking', back_populates='turf', lazy=True, cascade='all, delete-orphan',
+                               passive_deletes=True)
 
     def total_revenue(self):
-        total = db.session.query(func.sum(Turf.price_per_hour))\
-            .join(Booking).filter(Booking.turf_id == self.id, Booking.status == 'confirmed').scalar()
-        return total or 0.0
+        from .analytics import turf_revenue
+        return turf_revenue(self.id, include_archived=True)
 
     def __repr__(self):
         return f"<Turf {self.name} - {self.city}>"
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'city': self.city,
+            'address': self.address,
+            'price_per_hour': self.price_per_hour,
+            'description': self.description,
+            'image': self.image,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+# Nearby search on SQLite goes through the turf_geo R*Tree (see geo.py); on PostgreSQL through this.
+db.Index('ix_turf_lat_lng', Turf.latitude, Turf.longitude).ddl_if(dialect='postgresql')
+
+# City search is a prefix LIKE (see queries.city_prefix). SQLite's LIKE ignores case and is
+# only served from a NOCASE index; PostgreSQL's does not, so there it runs on lower(city).
+db.Index('ix_turf_city', Turf.city.collate('NOCASE')).ddl_if(dialect='sqlite')
+db.Index('ix_turf_city_lower', db.func.lower(Turf.city).label('city_lower'),
+         postgresql_ops={'city_lower': 'text_pattern_ops'}).ddl_if(dialect='postgresql')
+
 # ---------------------------
 # SLOT MODEL
 # ---------------------------
 class Slot(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    turf_id = db.Column(db.Integer, db.ForeignKey('turf.id'), nullable=False)
+    turf_id = db.Column(db.Integer, db.ForeignKey('turf.id', ondelete='CASCADE'), nullable=False)
     date = db.Column(db.Date, nullable=False)
     start_time = db.Column(db.Time, nullable=False)
     end_time = db.Column(db.Time, nullable=False)
     is_booked = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Covers the overlap check, the availability window and availability search.
+        db.Index('ix_slot_turf_date_start', 'turf_id', 'date', 'start_time', 'end_time', 'is_booked'),
+        db.Index('ix_slot_date', 'date'),  # the archive job's range scan
+        # Never reuse an id: archived slots keep theirs.
+        {'sqlite_autoincrement': True},
+    )
+
     # Relationships
     turf = db.relationship('Turf', back_populates='slots')
-    booking = db.relationship('Booking', back_populates='slot', uselist=False, cascade='all, delete-orphan')
+    bookings = db.relationship('Booking', back_populates='slot', lazy=True, cascade='all, delete-orphan',
+                               passive_deletes=True)
 
     def overlaps_with(self, other_start, other_end):
         """Check if this slot overlaps with another time range."""
         return not (self.end_time <= other_start or self.start_time >= other_end)
 
     def __repr__(self):
-        return f"<Slot {self.date} {self.start_time}-{self.end_time} @ {self.turf.name}>"
+        return f"<Slot {self.date} {self.start_time}-{self.end_time} @ turf {self.turf_id}>"
 
 # ---------------------------
 # BOOKING MODEL
@@ -97,22 +170,113 @@ class Slot(db.Model):
 class Booking(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    turf_id = db.Column(db.Integer, db.ForeignKey('turf.id'), nullable=False)
-    slot_id = db.Column(db.Integer, db.ForeignKey('slot.id'), nullable=False)
+    turf_id = db.Column(db.Integer, db.ForeignKey('turf.id', ondelete='CASCADE'), nullable=False)
+    slot_id = db.Column(db.Integer, db.ForeignKey('slot.id', ondelete='CASCADE'), nullable=False)
     status = db.Column(db.String(20), default='confirmed')  # confirmed, cancelled
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
     player = db.relationship('User', back_populates='bookings')
     turf = db.relationship('Turf', back_populates='bookings')
-    slot = db.relationship('Slot', back_populates='booking')
+    slot = db.relationship('Slot', back_populates='bookings')
+
+    __table_args__ = (
+        db.Index('ix_booking_user_created', 'user_id', 'created_at'),
+        db.Index('ix_booking_turf_status', 'turf_id', 'status'),
+        db.Index('ix_booking_slot', 'slot_id'),
+        # A slot keeps its cancelled bookings, but only one can be confirmed.
+        db.Index('uq_booking_slot_confirmed', 'slot_id', unique=True,
+                 sqlite_where=db.text("status = 'confirmed'"),
+                 postgresql_where=db.text("status = 'confirmed'")),
+        {'sqlite_autoincrement': True},
+    )
 
     def cancel(self):
         """Cancel the booking and free up the slot."""
-        self.status = 'cancelled'
-        if self.slot:
-            self.slot.is_booked = False
-        db.session.commit()
+        from .bookings import release_booking
+        return release_booking(self.id)
 
     def __repr__(self):
-        return f"<Booking {self.id} by {self.player.username} for {self.turf.name}>"
+        return f"<Booking {self.id} by user {self.user_id} for turf {self.turf_id}>"
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'turf_id': self.turf_id,
+            'turf_name': self.turf.name,
+            'slot_id': self.slot_id,
+            'date': self.slot.date.isoformat(),
+            'start_time': self.slot.start_time.strftime('%H:%M'),
+            'end_time': self.slot.end_time.strftime('%H:%M'),
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+# ---------------------------
+# ARCHIVE MODELS
+# ---------------------------
+# Slots older than the retention horizon, with their bookings, are moved
+# here by the archive job (see archive.py) under their original ids, so the
+# live tables only hold the current booking window. Live ids are never
+# reused (AUTOINCREMENT, or a sequence on PostgreSQL), so they cannot clash
+# with archived ones. Same columns and the same to_dict as the live rows,
+# so history views can render either.
+class SlotArchive(db.Model):
+    __tablename__ = 'slot_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    turf_id = db.Column(db.Integer, db.ForeignKey('turf.id', ondelete='CASCADE'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    is_booked = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_slot_archive_turf_date', 'turf_id', 'date'),
+    )
+
+    turf = db.relationship('Turf')
+
+class BookingArchive(db.Model):
+    __tablename__ = 'booking_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    turf_id = db.Column(db.Integer, db.ForeignKey('turf.id', ondelete='CASCADE'), nullable=False)
+    slot_id = db.Column(db.Integer, db.ForeignKey('slot_archive.id', ondelete='CASCADE'), nullable=False)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_booking_archive_user_created', 'user_id', 'created_at'),
+        db.Index('ix_booking_archive_turf_status', 'turf_id', 'status'),
+        db.Index('ix_booking_archive_slot', 'slot_id'),
+    )
+
+    player = db.relationship('User')
+    turf = db.relationship('Turf')
+    slot = db.relationship('SlotArchive')
+
+    to_dict = Booking.to_dict
+
+# ---------------------------
+# ROLLUP TABLE
+# ---------------------------
+# One row per turf and day: how many slots there are, how many of them are
+# booked and for how many hours, and the booked slots by start hour
+# (booked_00 .. booked_23) for peak-hour heatmaps. Kept current by
+# rollups.py in the same transaction as every slot and booking change
+# (archiving moves rows but changes no totals), so owner reports read a
+# row per day instead of scanning slots and bookings.
+ROLLUP_HOURS = range(24)
+
+turf_rollup = db.Table(
+    'turf_rollup',
+    db.Column('turf_id', db.Integer, db.ForeignKey('turf.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('day', db.Date, primary_key=True),
+    db.Column('slots', db.Integer, nullable=False, server_default='0'),
+    db.Column('bookings', db.Integer, nullable=False, server_default='0'),
+    db.Column('booked_hours', db.Float, nullable=False, server_default='0'),
+    *(db.Column(f'booked_{hour:02d}', db.Integer, nullable=False, server_default='0') for hour in ROLLUP_HOURS),
+)
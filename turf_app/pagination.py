@@ -0,0 +1,103 @@
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import datetime
+from flask import request, url_for
+from sqlalchemy import tuple_
+
+DEFAULT_PER_PAGE = 12
+MAX_PER_PAGE = 50
+
+Page = namedtuple('Page', 'items next_cursor prev_cursor per_page')
+
+# ---------------------------
+# KEYSET (CURSOR) PAGINATION
+# ---------------------------
+# Listings are ordered newest first on (created_at, id). A cursor encodes the
+# (created_at, id) of the row at the edge of a page, and the next page starts
+# strictly after it, so page N costs one index range scan, same as page 1.
+
+def encode_cursor(row):
+    raw = json.dumps([row.created_at.isoformat(), row.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (created_at, id) for a cursor, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+def clamp_per_page(per_page, default=DEFAULT_PER_PAGE):
+    if not per_page:
+        return default
+    return max(1, min(per_page, MAX_PER_PAGE))
+
+def keyset_query(query, model, after=None, before=None, limit=DEFAULT_PER_PAGE):
+    """Apply the keyset filter, ordering and limit (one extra row to detect more)."""
+    key = tuple_(model.created_at, model.id)
+    if before is not None:
+        query = query.filter(key > tuple_(*before))
+        query = query.order_by(model.created_at.asc(), model.id.asc())
+    else:
+        if after is not None:
+            query = query.filter(key < tuple_(*after))
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    return query.limit(limit + 1)
+
+def keyset_page(query, model, after=None, before=None, per_page=DEFAULT_PER_PAGE):
+    """Fetch one page newest-first. `after`/`before` are cursor strings from a previous page."""
+    return keyset_merged_page([(query, model)], after, before, per_page)
+
+def keyset_merged_page(sources, after=None, before=None, per_page=DEFAULT_PER_PAGE):
+    """One page across several (query, model) sources sharing an id space, e.g. live and archived rows.
+
+    Each source is keyset-queried on its own and the results are merged on
+    (created_at, id), so a page costs one index range scan per source.
+    """
+    after_key, before_key = decode_cursor(after), decode_cursor(before)
+    if before_key is not None:
+        after_key = None
+
+    rows = []
+    for query, model in sources:
+        rows.extend(keyset_query(query, model, after_key, before_key, per_page).all())
+    if len(sources) > 1:
+        rows.sort(key=lambda row: (row.created_at, row.id), reverse=before_key is None)
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if before_key is not None:
+        rows.reverse()
+        has_newer, has_older = has_more, True
+    else:
+        has_newer, has_older = after_key is not None, has_more
+
+    return Page(
+        items=rows,
+        next_cursor=encode_cursor(rows[-1]) if rows and has_older else None,
+        prev_cursor=encode_cursor(rows[0]) if rows and has_newer else None,
+        per_page=per_page,
+    )
+
+def cursor_url(endpoint, **values):
+    """URL of another page of the current listing: the request's query string (filters,
+    per_page) with its cursor replaced by `values`; a None value drops that argument."""
+    args = request.args.to_dict(flat=False)
+    args.pop('after', None)
+    args.pop('before', None)
+    args.update(values)
+    return url_for(endpoint, **args)
+
+def page_meta(page):
+    """Cursor fields for JSON responses."""
+    return {
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+        'per_page': page.per_page,
+    }
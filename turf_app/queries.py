@@ -0,0 +1,61 @@
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from . import db
+from .models import Turf, Slot, Booking, BookingArchive
+
+# ---------------------------
+# ROUTE QUERIES
+# ---------------------------
+# Each hot route builds its query here so the query-plan check runs
+# exactly what the views run. Every one of them is served by an index.
+# Listings are left unordered: pagination.keyset_query adds the ordering.
+# Loaders eager-load exactly the relationships their template touches, so no
+# view lazy-loads per row (see querybudget for the per-view statement limits).
+# Soft-deleted turfs (deleted_at set) are filtered out of every turf query.
+
+def all_turfs():
+    return Turf.query.filter(Turf.deleted_at.is_(None))
+
+def turf(turf_id):
+    """A live turf by id, for first_or_404()."""
+    return all_turfs().filter(Turf.id == turf_id)
+
+def city_prefix(city):
+    """City prefix match ignoring case: SQLite's LIKE already does (NOCASE index), elsewhere on lower(city)."""
+    pattern = city.replace('/', '//').replace('%', '/%').replace('_', '/_') + '%'
+    if db.engine.dialect.name == 'sqlite':
+        return Turf.city.like(pattern, escape='/')
+    return func.lower(Turf.city).like(pattern.lower(), escape='/')
+
+def turfs_by_city(city):
+    return all_turfs().filter(city_prefix(city))
+
+def overlapping_slot(turf_id, slot_date, start_time, end_time):
+    return Slot.query.filter(
+        Slot.turf_id == turf_id,
+        Slot.date == slot_date,
+        Slot.start_time < end_time,
+        Slot.end_time > start_time,
+    )
+
+def user_bookings(user_id):
+    """booking_history renders b.turf.name and b.slot.date/start_time/end_time."""
+    return Booking.query.filter_by(user_id=user_id).options(
+        joinedload(Booking.turf, innerjoin=True),
+        joinedload(Booking.slot, innerjoin=True),
+    )
+
+def user_archived_bookings(user_id):
+    """The same, over booking_archive, for booking_history?archived=1."""
+    return BookingArchive.query.filter_by(user_id=user_id).options(
+        joinedload(BookingArchive.turf, innerjoin=True),
+        joinedload(BookingArchive.slot, innerjoin=True),
+    )
+
+def slot_owner(slot_id):
+    """(turf_id, owner_id) of a slot on a live turf; delete_slot checks the owner."""
+    return (
+        db.session.query(Slot.turf_id, Turf.owner_id)
+        .join(Turf, Turf.id == Slot.turf_id)
+        .filter(Slot.id == slot_id, Turf.deleted_at.is_(None))
+    )
@@ -0,0 +1,75 @@
+import time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+class QueryBudgetExceeded(RuntimeError):
+    """A view issued more SQL statements than its declared budget."""
+
+# ---------------------------
+# PER-REQUEST SQL STATEMENT COUNTING
+# ---------------------------
+# Views declare how many statements they may run with @query_budget(n).
+# When counting is on (debug, testing or SQL_COUNT_QUERIES), every request
+# reports its count in X-SQL-Queries and overruns are logged; under testing
+# (or SQL_QUERY_BUDGET_RAISE) an overrun raises, so N+1 regressions fail loudly.
+# The same counters, plus the time spent in SQL, feed the /metrics histograms.
+
+def query_budget(limit):
+    """Declare the maximum number of SQL statements a view may run per request."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+def start_counting():
+    """Count (and time) SQL statements for the rest of this request."""
+    if not g.get('sql_counting'):
+        g.sql_counting = True
+        g.sql_statements = 0
+        g.sql_seconds = 0.0
+
+def statement_count():
+    return g.get('sql_statements', 0)
+
+def statement_seconds():
+    return g.get('sql_seconds', 0.0)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and g.get('sql_counting'):
+        g.sql_statements = g.get('sql_statements', 0) + 1
+        conn.info.setdefault('statement_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _time_statement(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('statement_started')
+    if started and has_request_context() and g.get('sql_counting'):
+        g.sql_seconds = g.get('sql_seconds', 0.0) + time.perf_counter() - started.pop()
+
+@event.listens_for(Engine, 'handle_error')
+def _drop_failed_statement(context):
+    started = context.connection.info.get('statement_started') if context.connection else None
+    if started:
+        started.pop()
+
+def init_query_budget(app):
+    enabled = app.debug or app.testing or app.config.get('SQL_COUNT_QUERIES')
+    if not enabled:
+        return
+    raise_on_overrun = app.config.get('SQL_QUERY_BUDGET_RAISE', app.testing)
+
+    app.before_request(start_counting)
+
+    @app.after_request
+    def check_budget(response):
+        count = statement_count()
+        response.headers['X-SQL-Queries'] = str(count)
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None)
+        if budget is not None and count > budget:
+            message = f'{request.endpoint} ran {count} SQL statements (budget {budget})'
+            if raise_on_overrun:
+                raise QueryBudgetExceeded(message)
+            current_app.logger.warning(message)
+        return response
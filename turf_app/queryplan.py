@@ -0,0 +1,85 @@
+import re
+from datetime import datetime, time, timedelta
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from . import db, queries
+from .analytics import owner_stats_query, turf_revenue_query
+from .archive import archive_cutoff
+from .geo import candidates_query
+from .slotsearch import available_turfs_query
+from .availability import window_slots_query
+from .models import Turf, Slot, Booking, SlotArchive, BookingArchive
+from .pagination import keyset_query
+from .rollups import rollup_report_query
+from .seed import seed_database
+
+# ---------------------------
+# EXPLAIN QUERY PLAN
+# ---------------------------
+class explain_query_plan(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+@compiles(explain_query_plan, 'sqlite')
+def _explain_sqlite(element, compiler, **kw):
+    return 'EXPLAIN QUERY PLAN ' + compiler.process(element.statement, **kw)
+
+def explain(query):
+    """Return the plan detail lines SQLite chose for a query."""
+    rows = db.session.execute(explain_query_plan(query.statement)).fetchall()
+    return [row[-1] for row in rows]
+
+def full_scans(plan):
+    """Plan lines that walk a whole table without any index (a constrained virtual-table scan uses one)."""
+    return [line for line in plan if line.startswith('SCAN ') and ' USING ' not in line
+            and not re.search(r' VIRTUAL TABLE INDEX \d+:\S', line)]
+
+def route_queries(sample):
+    """The queries each hot route runs, keyed by route, for the given sample ids."""
+    day = sample['date']
+    cursor = (datetime.utcnow(), sample['turf_id'])
+    return {
+        'index': keyset_query(queries.all_turfs(), Turf, limit=6),
+        'turf_list': keyset_query(queries.all_turfs(), Turf),
+        'turf_list?after': keyset_query(queries.all_turfs(), Turf, after=cursor),
+        'turf_list?before': keyset_query(queries.all_turfs(), Turf, before=cursor),
+        'turf_list?city': keyset_query(queries.turfs_by_city('pun'), Turf),
+        # Without a city every live turf is visited by design (one index seek each).
+        'available_turfs?city': available_turfs_query('pun', day, time(18), time(20), 1200),
+        'nearby_turfs': candidates_query(18.52, 73.86, 5),
+        'turf_details': window_slots_query(sample['turf_id'], day, day + timedelta(days=6)),
+        'add_slot': queries.overlapping_slot(sample['turf_id'], day, time(18), time(19)),
+        'booking_history': keyset_query(queries.user_bookings(sample['user_id']), Booking),
+        'booking_history?after': keyset_query(queries.user_bookings(sample['user_id']), Booking, after=cursor),
+        'booking_history?archived': keyset_query(queries.user_archived_bookings(sample['user_id']), BookingArchive),
+        'owner_dashboard': owner_stats_query(sample['owner_id']),
+        'owner_dashboard?archived': owner_stats_query(sample['owner_id'], SlotArchive, BookingArchive),
+        'owner_reports': rollup_report_query(sample['owner_id'], day - timedelta(days=29), day),
+        'total_revenue': turf_revenue_query(sample['turf_id']),
+        'archive_batch': Slot.query.with_entities(Slot.id).filter(Slot.date < archive_cutoff(30)).limit(5000),
+    }
+
+def check_route_plans(sample):
+    """Map each route to its full-scan plan lines; an empty dict means all indexed."""
+    failures = {}
+    for route, query in route_queries(sample).items():
+        scans = full_scans(explain(query))
+        if scans:
+            failures[route] = scans
+    return failures
+
+# ---------------------------
+# SEEDED DATASET
+# ---------------------------
+def seed_plan_dataset(owners=200, players=2000, turfs=2000, slots_per_turf=30, bookings=20000, batch=5000):
+    """Fill an empty database with enough rows that the planner's choices are meaningful."""
+    result = seed_database(users=owners + players, owners=owners, turfs=turfs,
+                           slots=turfs * slots_per_turf, bookings=bookings, batch=batch)
+    return {
+        'owner_id': result.owner_id,
+        'user_id': result.player_id,
+        'turf_id': result.turf_id,
+        'date': result.date,
+    }
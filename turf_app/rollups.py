@@ -0,0 +1,202 @@
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+from sqlalchemy import and_, bindparam, case, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Integer
+from . import db
+from .analytics import hours_between, utilization_pct
+from .models import ROLLUP_HOURS, Turf, Slot, SlotArchive, turf_rollup
+
+REBUILD_BATCH_SIZE = 500
+MAX_REPORT_DAYS = 731
+GRANULARITIES = ('day', 'week', 'month')
+
+RebuildResult = namedtuple('RebuildResult', 'turfs rows seconds')
+ReportPoint = namedtuple('ReportPoint', 'period slots bookings revenue utilization')
+RollupReport = namedtuple('RollupReport', 'series heatmap totals start end granularity')
+
+# ---------------------------
+# SQL HELPERS
+# ---------------------------
+class start_hour(FunctionElement):
+    """Hour of day (0-23) of a TIME, computed by the database."""
+    type = Integer()
+    inherit_cache = True
+
+@compiles(start_hour)
+def _start_hour_sqlite(element, compiler, **kw):
+    return "CAST(strftime('%%H', %s) AS INTEGER)" % compiler.process(list(element.clauses)[0], **kw)
+
+@compiles(start_hour, 'postgresql')
+def _start_hour_pg(element, compiler, **kw):
+    return "CAST(EXTRACT(HOUR FROM %s) AS INTEGER)" % compiler.process(list(element.clauses)[0], **kw)
+
+# ---------------------------
+# INCREMENTAL UPDATES
+# ---------------------------
+# Every change adds a signed delta for the slots it touches, grouped by
+# turf and day, with one INSERT ... SELECT ... ON CONFLICT DO UPDATE inside
+# the caller's transaction: it commits or rolls back with the change
+# itself. Bookings are counted from booked slots, so callers apply a
+# booking delta while the slot is booked (after claiming it, before
+# releasing or deleting it). Revenue is not stored: reports multiply
+# booked hours by the turf's current price, as the dashboard does.
+
+HOUR_COLUMNS = [f'booked_{hour:02d}' for hour in ROLLUP_HOURS]
+MEASURES = ['slots', 'bookings', 'booked_hours', *HOUR_COLUMNS]
+
+def rollup_select(slot_model, *where, slots=1, bookings=1):
+    """Per turf/day deltas of the matching slots, `slots`/`bookings` times over (+1, -1 or 0)."""
+    hour = start_hour(slot_model.start_time)
+    booked = case((slot_model.is_booked, 1), else_=0)
+    return (
+        select(slot_model.turf_id, slot_model.date,
+               func.count() * slots,
+               func.sum(booked) * bookings,
+               func.sum(booked * hours_between(slot_model.start_time, slot_model.end_time)) * bookings,
+               *(func.sum(case((and_(slot_model.is_booked, hour == h), 1), else_=0)) * bookings
+                 for h in ROLLUP_HOURS))
+        .where(*where)
+        .group_by(slot_model.turf_id, slot_model.date)
+    )
+
+def rollup_upsert(dialect_name, select_):
+    """INSERT the deltas, adding them to the rows that already exist."""
+    insert = postgresql.insert if dialect_name == 'postgresql' else sqlite.insert
+    stmt = insert(turf_rollup).from_select(['turf_id', 'day', *MEASURES], select_)
+    return stmt.on_conflict_do_update(
+        index_elements=['turf_id', 'day'],
+        set_={name: turf_rollup.c[name] + stmt.excluded[name] for name in MEASURES},
+    )
+
+_delta_statements = {}
+
+def _delta_statement(dialect_name):
+    # Built once per dialect with bound signs and slot ids: constructing the
+    # wide statement costs far more than running it.
+    statement = _delta_statements.get(dialect_name)
+    if statement is None:
+        statement = _delta_statements[dialect_name] = rollup_upsert(dialect_name, rollup_select(
+            Slot, Slot.id.in_(bindparam('slot_ids', expanding=True)),
+            slots=bindparam('slots', type_=Integer), bookings=bindparam('bookings', type_=Integer),
+        ))
+    return statement
+
+def _apply(slot_ids, slots=0, bookings=0):
+    db.session.execute(_delta_statement(db.engine.dialect.name),
+                       {'slot_ids': list(slot_ids), 'slots': slots, 'bookings': bookings})
+
+def slots_added(slot_ids):
+    """Count new slots in; call before committing their insert."""
+    if slot_ids:
+        _apply(slot_ids, slots=1)
+
+def slot_removed(slot_id):
+    """Take a slot (and its booking, if booked) out; call before deleting it."""
+    _apply([slot_id], slots=-1, bookings=-1)
+
+def booking_changed(slot_id, sign):
+    """Count a slot's booking in (+1, after claiming) or out (-1, before freeing the slot)."""
+    _apply([slot_id], bookings=sign)
+
+# ---------------------------
+# REBUILD
+# ---------------------------
+def rebuild_statements(dialect_name, turf_ids=None):
+    """Statements that re-derive the rollups (of some turfs, or all) from live and archived slots."""
+    live, archived = [], []
+    if turf_ids is not None:
+        live, archived = [Slot.turf_id.in_(turf_ids)], [SlotArchive.turf_id.in_(turf_ids)]
+    clear = delete(turf_rollup)
+    if turf_ids is not None:
+        clear = clear.where(turf_rollup.c.turf_id.in_(turf_ids))
+    return [
+        clear,
+        # ON CONFLICT needs a WHERE before it in SQLite's INSERT ... SELECT grammar.
+        rollup_upsert(dialect_name, rollup_select(Slot, *(live or [Slot.id.isnot(None)]))),
+        rollup_upsert(dialect_name, rollup_select(SlotArchive, *(archived or [SlotArchive.id.isnot(None)]))),
+    ]
+
+def rebuild_rollups(batch_size=None):
+    """Re-derive every turf's rollups from its slots, batch_size turfs per transaction."""
+    batch_size = batch_size or REBUILD_BATCH_SIZE
+    started = time.perf_counter()
+    turfs = rows = 0
+    last_id = 0
+    while True:
+        turf_ids = db.session.execute(
+            select(Turf.id).where(Turf.id > last_id).order_by(Turf.id).limit(batch_size)
+        ).scalars().all()
+        if not turf_ids:
+            break
+        for statement in rebuild_statements(db.engine.dialect.name, turf_ids):
+            db.session.execute(statement)
+        rows += db.session.execute(
+            select(func.count()).select_from(turf_rollup).where(turf_rollup.c.turf_id.in_(turf_ids))
+        ).scalar()
+        db.session.commit()
+        turfs += len(turf_ids)
+        last_id = turf_ids[-1]
+    return RebuildResult(turfs, rows, time.perf_counter() - started)
+
+# ---------------------------
+# REPORTS
+# ---------------------------
+# A report reads the owner's rollup rows for the range through the primary
+# key and sums them per day in SQL: its cost depends on the range and the
+# number of turfs, never on how many slots or bookings they have.
+
+def period_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+def rollup_report_query(owner_id, start, end, turf_id=None):
+    """(day, slots, bookings, revenue, booked_00 .. booked_23) over an owner's live turfs, one row per day."""
+    c = turf_rollup.c
+    query = (
+        db.session.query(c.day, func.sum(c.slots), func.sum(c.bookings),
+                         func.sum(c.booked_hours * Turf.price_per_hour),
+                         *(func.sum(c[name]) for name in HOUR_COLUMNS))
+        .join(Turf, Turf.id == c.turf_id)
+        .filter(Turf.owner_id == owner_id, Turf.deleted_at.is_(None), c.day.between(start, end))
+        .group_by(c.day)
+    )
+    if turf_id is not None:
+        query = query.filter(c.turf_id == turf_id)
+    return query
+
+def rollup_report(owner_id, start, end, turf_id=None, granularity='day'):
+    """Time series (per day, week or month) and weekday x hour booking heatmap for an owner's turfs."""
+    end = min(end, start + timedelta(days=MAX_REPORT_DAYS - 1))
+    periods = {}
+    day = start
+    while day <= end:
+        periods.setdefault(period_start(day, granularity), [0, 0, 0.0])
+        day += timedelta(days=1)
+    heatmap = [[0] * len(ROLLUP_HOURS) for _ in range(7)]
+    for day, slots, bookings, revenue, *by_hour in rollup_report_query(owner_id, start, end, turf_id):
+        totals = periods[period_start(day, granularity)]
+        totals[0] += slots
+        totals[1] += bookings
+        totals[2] += revenue or 0.0
+        row = heatmap[day.weekday()]
+        for hour, count in enumerate(by_hour):
+            row[hour] += count
+
+    series = [ReportPoint(period, slots, bookings, round(revenue, 2), utilization_pct(bookings, slots))
+              for period, (slots, bookings, revenue) in periods.items()]
+    slots, bookings = sum(p.slots for p in series), sum(p.bookings for p in series)
+    totals = ReportPoint(None, slots, bookings, round(sum(p.revenue for p in series), 2),
+                         utilization_pct(bookings, slots))
+    return RollupReport(series, heatmap, totals, start, end, granularity)
+
+def default_report_range(today=None):
+    """The last 30 days, today included."""
+    today = today or date.today()
+    return today - timedelta(days=29), today
@@ -0,0 +1,102 @@
+from bisect import bisect_left, insort
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from . import db, rollups
+from .models import Slot
+
+MAX_SCHEDULE_DAYS = 366
+MAX_SCHEDULE_SLOTS = 20000
+
+ScheduleResult = namedtuple('ScheduleResult', 'created skipped')
+
+# ---------------------------
+# RECURRING SCHEDULES
+# ---------------------------
+def expand_schedule(start_date, end_date, weekdays, open_time, close_time, slot_minutes, excluded=()):
+    """Yield (date, start_time, end_time) for every slot the schedule describes.
+
+    `weekdays` uses date.weekday() numbering (Monday is 0). Slots that would
+    run past `close_time` are not generated.
+    """
+    if slot_minutes <= 0:
+        raise ValueError('Slot length must be positive.')
+    if open_time >= close_time:
+        raise ValueError('Closing time must be after opening time.')
+    if end_date < start_date:
+        raise ValueError('End date must not be before start date.')
+    if (end_date - start_date).days >= MAX_SCHEDULE_DAYS:
+        raise ValueError(f'Schedules can span at most {MAX_SCHEDULE_DAYS} days.')
+
+    length = timedelta(minutes=slot_minutes)
+    excluded = set(excluded)
+    day = start_date
+    while day <= end_date:
+        if day.weekday() in weekdays and day not in excluded:
+            start = datetime.combine(day, open_time)
+            close = datetime.combine(day, close_time)
+            while start + length <= close:
+                yield day, start.time(), (start + length).time()
+                start += length
+        day += timedelta(days=1)
+
+class SlotIntervalIndex:
+    """Existing slots of one turf per day, sorted by start time, for O(log n) overlap checks."""
+
+    def __init__(self, rows):
+        self._days = defaultdict(list)
+        for slot_date, start, end in rows:
+            self._days[slot_date].append((start, end))
+        for intervals in self._days.values():
+            intervals.sort()
+
+    @classmethod
+    def load(cls, turf_id, start_date, end_date):
+        rows = (
+            db.session.query(Slot.date, Slot.start_time, Slot.end_time)
+            .filter(Slot.turf_id == turf_id, Slot.date.between(start_date, end_date))
+            .all()
+        )
+        return cls(rows)
+
+    def overlaps(self, slot_date, start, end):
+        intervals = self._days.get(slot_date)
+        if not intervals:
+            return False
+        # Intervals are non-overlapping, so only the last one starting before `end` can clash.
+        i = bisect_left(intervals, (end,))
+        return i > 0 and intervals[i - 1][1] > start
+
+    def add(self, slot_date, start, end):
+        insort(self._days[slot_date], (start, end))
+
+def _insert_slots(rows):
+    rollups.slots_added(db.session.execute(insert(Slot).returning(Slot.id), rows).scalars().all())
+
+def generate_slots(turf_id, start_date, end_date, weekdays, open_time, close_time, slot_minutes,
+                   excluded=(), batch_size=1000):
+    """Create a recurring schedule's slots in one transaction, skipping any that overlap."""
+    index = SlotIntervalIndex.load(turf_id, start_date, end_date)
+    created = skipped = 0
+    batch = []
+    try:
+        for slot_date, start, end in expand_schedule(
+                start_date, end_date, weekdays, open_time, close_time, slot_minutes, excluded):
+            if index.overlaps(slot_date, start, end):
+                skipped += 1
+                continue
+            if created >= MAX_SCHEDULE_SLOTS:
+                raise ValueError(f'Schedules can create at most {MAX_SCHEDULE_SLOTS} slots at once.')
+            index.add(slot_date, start, end)
+            batch.append({'turf_id': turf_id, 'date': slot_date, 'start_time': start, 'end_time': end})
+            created += 1
+            if len(batch) >= batch_size:
+                _insert_slots(batch)
+                batch = []
+        if batch:
+            _insert_slots(batch)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return ScheduleResult(created, skipped)
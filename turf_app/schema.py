@@ -0,0 +1,243 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import MetaData, delete, exc, exists, func, insert, inspect, literal, select, text, update
+from sqlalchemy.schema import CreateTable
+from . import db, models  # noqa: F401  (registers every table on db.metadata)
+from .database import advance_id_sequence
+from .geo import install_geo_index
+from .search import install_search_index
+
+# ---------------------------
+# SCHEMA VERSIONING
+# ---------------------------
+# The database records the schema version it was upgraded to in
+# schema_version. Normal startup only reads that number; creating tables,
+# indexes and later changes is the job of `flask upgrade`, which applies
+# every migration newer than the stamped version, in order, in one
+# transaction. New schema changes append a @migration(n) step.
+#
+# Every SQLite connection enforces foreign keys (see database.py). While
+# migrating they are switched off (a table rebuild drops the old table,
+# which must not cascade) and checked once before the commit.
+
+schema_version_table = db.Table(
+    'schema_version',
+    db.Column('version', db.Integer, primary_key=True),
+    db.Column('upgraded_at', db.DateTime, nullable=False),
+)
+
+MIGRATIONS = {}
+
+def migration(version):
+    def decorator(fn):
+        assert version == len(MIGRATIONS) + 1, 'migrations must be numbered consecutively'
+        MIGRATIONS[version] = fn
+        return fn
+    return decorator
+
+def target_version():
+    return len(MIGRATIONS)
+
+def stamped_version(connection):
+    """Schema version recorded in the database; 0 for a database never upgraded."""
+    try:
+        return connection.execute(select(func.max(schema_version_table.c.version))).scalar() or 0
+    except exc.DBAPIError:
+        connection.rollback()
+        return 0
+
+def _set_sqlite_foreign_keys(conn, on):
+    # The pragma is a no-op inside a transaction, so it is set between them.
+    conn.exec_driver_sql(f'PRAGMA foreign_keys={"ON" if on else "OFF"}')
+    conn.commit()
+
+def upgrade():
+    """Apply every pending migration; returns the list of versions applied."""
+    applied = []
+    with db.engine.connect() as conn:
+        sqlite = conn.dialect.name == 'sqlite'
+        if sqlite:
+            _set_sqlite_foreign_keys(conn, False)
+        try:
+            with conn.begin():
+                schema_version_table.create(conn, checkfirst=True)
+                current = stamped_version(conn)
+                for version in range(current + 1, target_version() + 1):
+                    MIGRATIONS[version](conn)
+                    conn.execute(insert(schema_version_table).values(version=version, upgraded_at=datetime.utcnow()))
+                    applied.append(version)
+                if applied and sqlite:
+                    violations = conn.exec_driver_sql('PRAGMA foreign_key_check').fetchall()
+                    if violations:
+                        raise RuntimeError(f'Upgrade left {len(violations)} rows with dangling foreign keys, '
+                                           f'first: {tuple(violations[0])}')
+                    conn.execute(text('ANALYZE'))
+        finally:
+            if sqlite:
+                _set_sqlite_foreign_keys(conn, True)
+    return applied
+
+def check_schema(app):
+    """Startup check: one query for the stamped version, upgrading only if allowed."""
+    with app.app_context():
+        with db.engine.connect() as conn:
+            current = stamped_version(conn)
+        if current >= target_version():
+            return
+        if app.config.get('SCHEMA_AUTO_UPGRADE'):
+            applied = upgrade()
+            app.logger.info(f'Database upgraded to schema version {applied[-1]}.')
+        else:
+            app.logger.warning(f'Database schema is at version {current}, the code expects '
+                               f'{target_version()}: run `flask --app run upgrade`.')
+
+# ---------------------------
+# MIGRATIONS
+# ---------------------------
+def _create_missing_indexes(conn):
+    """Create model indexes the database lacks; ones over columns a later migration adds wait for it."""
+    inspector = inspect(conn)
+    for table in db.metadata.sorted_tables:
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            if {c.name for c in index.columns} <= existing:
+                index.create(bind=conn, checkfirst=True)
+
+def _cancel_double_bookings(conn):
+    """Keep only the earliest confirmed booking per slot, so the one-confirmed-booking index can be built."""
+    booking = models.Booking.__table__
+    earlier = booking.alias('earlier')
+    cancelled = conn.execute(
+        update(booking)
+        .where(booking.c.status == 'confirmed',
+               exists().where(earlier.c.slot_id == booking.c.slot_id, earlier.c.status == 'confirmed',
+                              earlier.c.id < booking.c.id))
+        .values(status='cancelled')
+    ).rowcount
+    if cancelled:
+        current_app.logger.warning(f'Cancelled {cancelled} confirmed booking(s) on already booked slots '
+                                   f'(the earliest booking of each slot was kept).')
+    return cancelled
+
+@migration(1)
+def baseline(conn):
+    """Tables, hot-path indexes and the turf search index."""
+    db.metadata.create_all(conn)
+    _cancel_double_bookings(conn)
+    _create_missing_indexes(conn)
+    install_search_index(conn)
+
+def _add_missing_columns(conn, table, *names):
+    existing = {c['name'] for c in inspect(conn).get_columns(table.name)}
+    for name in names:
+        if name not in existing:
+            column = table.c[name]
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {name} '
+                              f'{column.type.compile(dialect=conn.dialect)}'))
+
+def _rebuild_sqlite_table(conn, table):
+    """SQLite cannot alter constraints: copy the rows into a table built from the model, then swap."""
+    scratch = MetaData()
+    for t in db.metadata.sorted_tables:
+        t.to_metadata(scratch)
+    new = table.to_metadata(scratch, name=f'{table.name}_new')
+    existing = {c['name'] for c in inspect(conn).get_columns(table.name)}
+    columns = ', '.join(c.name for c in table.columns if c.name in existing)
+    conn.execute(CreateTable(new))
+    conn.execute(text(f'INSERT INTO {new.name} ({columns}) SELECT {columns} FROM {table.name}'))
+    conn.execute(text(f'DROP TABLE {table.name}'))
+    conn.execute(text(f'ALTER TABLE {new.name} RENAME TO {table.name}'))
+    for index in table.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+@migration(2)
+def cascading_deletes(conn):
+    """ON DELETE CASCADE from turf to slot and booking, and turf.deleted_at for soft deletes."""
+    _add_missing_columns(conn, models.Turf.__table__, 'deleted_at')
+    for table in (models.Booking.__table__, models.Slot.__table__):
+        stale = [fk for fk in inspect(conn).get_foreign_keys(table.name)
+                 if fk['referred_table'] != 'user' and (fk['options'].get('ondelete') or '').upper() != 'CASCADE']
+        if not stale:
+            continue
+        if conn.dialect.name == 'sqlite':
+            _rebuild_sqlite_table(conn, table)
+            continue
+        for fk in stale:
+            columns, referred = ', '.join(fk['constrained_columns']), ', '.join(fk['referred_columns'])
+            conn.execute(text(f'ALTER TABLE {table.name} DROP CONSTRAINT {fk["name"]}'))
+            conn.execute(text(f'ALTER TABLE {table.name} ADD CONSTRAINT {fk["name"]} FOREIGN KEY ({columns}) '
+                              f'REFERENCES {fk["referred_table"]} ({referred}) ON DELETE CASCADE'))
+    _create_missing_indexes(conn)
+
+@migration(3)
+def archive_tables(conn):
+    """slot_archive and booking_archive, and the slot date index the archive job scans."""
+    db.metadata.create_all(conn, tables=[models.SlotArchive.__table__, models.BookingArchive.__table__])
+    _create_missing_indexes(conn)
+
+@migration(4)
+def covering_slot_index(conn):
+    """Widen ix_slot_turf_date_start with end_time and is_booked so slot searches skip the table."""
+    index = next(i for i in models.Slot.__table__.indexes if i.name == 'ix_slot_turf_date_start')
+    columns = [c['column_names'] for c in inspect(conn).get_indexes('slot') if c['name'] == index.name]
+    if columns != [[c.name for c in index.columns]]:
+        index.drop(bind=conn, checkfirst=True)
+        index.create(bind=conn)
+
+@migration(5)
+def turf_coordinates(conn):
+    """turf.latitude/longitude and the spatial index nearby searches use."""
+    _add_missing_columns(conn, models.Turf.__table__, 'latitude', 'longitude')
+    _create_missing_indexes(conn)
+    install_geo_index(conn)
+
+@migration(6)
+def turf_rollups(conn):
+    """turf_rollup, filled from the existing live and archived slots."""
+    from .rollups import rebuild_statements
+
+    db.metadata.create_all(conn, tables=[models.turf_rollup])
+    for statement in rebuild_statements(conn.dialect.name):
+        conn.execute(statement)
+
+def _renumber_archived_ids(conn, table, archive, references=()):
+    """Give live rows whose id is already archived (reused before AUTOINCREMENT) fresh ids."""
+    clashes = conn.execute(
+        select(table.c.id).where(table.c.id.in_(select(archive.c.id))).order_by(table.c.id)
+    ).scalars().all()
+    next_id = max(conn.execute(select(func.max(table.c.id))).scalar() or 0,
+                  conn.execute(select(func.max(archive.c.id))).scalar() or 0) + 1
+    others = [c for c in table.columns if c.name != 'id']
+    for old in clashes:
+        if references:
+            # Copy, repoint, delete: the referencing foreign keys do not cascade updates.
+            conn.execute(insert(table).from_select(
+                ['id', *(c.name for c in others)], select(literal(next_id), *others).where(table.c.id == old)))
+            for column in references:
+                conn.execute(update(column.table).where(column == old).values({column.name: next_id}))
+            conn.execute(delete(table).where(table.c.id == old))
+        else:
+            conn.execute(update(table).where(table.c.id == old).values(id=next_id))
+        next_id += 1
+    return len(clashes)
+
+def _uses_autoincrement(conn, table):
+    sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                       {'name': table.name}).scalar()
+    return 'AUTOINCREMENT' in (sql or '').upper()
+
+@migration(7)
+def unique_live_ids(conn):
+    """Never reuse slot and booking ids, so live rows cannot collide with archived ones."""
+    slot, booking = models.Slot.__table__, models.Booking.__table__
+    _renumber_archived_ids(conn, slot, models.SlotArchive.__table__, [booking.c.slot_id])
+    _renumber_archived_ids(conn, booking, models.BookingArchive.__table__)
+    for table, archive in ((booking, models.BookingArchive.__table__), (slot, models.SlotArchive.__table__)):
+        if conn.dialect.name == 'sqlite' and not _uses_autoincrement(conn, table):
+            _rebuild_sqlite_table(conn, table)
+        advance_id_sequence(conn, table, conn.execute(select(func.max(archive.c.id))).scalar() or 0)
+
+@migration(8)
+def city_lower_index(conn):
+    """ix_turf_city_lower, the index case-insensitive city prefix searches use on PostgreSQL."""
+    _create_missing_indexes(conn)
@@ -0,0 +1,94 @@
+import re
+from collections import namedtuple
+from sqlalchemy import column, event, func, literal_column, or_, table, text
+from . import db
+from .models import Turf
+from .queries import city_prefix
+
+SearchPage = namedtuple('SearchPage', 'turfs query page per_page has_next')
+
+# Column weights for bm25(): a hit in the name outranks one in the description.
+RANK_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+MAX_PER_PAGE = 50
+
+# ---------------------------
+# FTS5 INDEX (SQLite)
+# ---------------------------
+# turf_fts is an external-content FTS5 table over turf; triggers keep it in
+# sync on every insert, update and delete, whichever code path writes turfs.
+SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS turf_fts USING fts5(
+        name, city, address, description,
+        content='turf', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS turf_fts_ai AFTER INSERT ON turf BEGIN
+        INSERT INTO turf_fts(rowid, name, city, address, description)
+        VALUES (new.id, new.name, new.city, new.address, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS turf_fts_ad AFTER DELETE ON turf BEGIN
+        INSERT INTO turf_fts(turf_fts, rowid, name, city, address, description)
+        VALUES ('delete', old.id, old.name, old.city, old.address, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS turf_fts_au AFTER UPDATE OF name, city, address, description ON turf BEGIN
+        INSERT INTO turf_fts(turf_fts, rowid, name, city, address, description)
+        VALUES ('delete', old.id, old.name, old.city, old.address, old.description);
+        INSERT INTO turf_fts(rowid, name, city, address, description)
+        VALUES (new.id, new.name, new.city, new.address, new.description);
+    END""",
+]
+
+turf_fts = table('turf_fts', column('rowid'))
+
+def install_search_index(connection, rebuild=False):
+    """Create the FTS table and triggers if missing; optionally reindex every turf."""
+    if connection.dialect.name != 'sqlite':
+        return False
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'turf_fts'")
+    ).first()
+    for statement in SEARCH_DDL:
+        connection.execute(text(statement))
+    if rebuild or not exists:
+        connection.execute(text("INSERT INTO turf_fts(turf_fts) VALUES ('rebuild')"))
+    return True
+
+@event.listens_for(Turf.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    install_search_index(connection)
+
+# ---------------------------
+# SEARCH
+# ---------------------------
+def match_expression(q):
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    words = re.findall(r'\w+', q or '')
+    return ' '.join(f'"{w}"*' for w in words)
+
+def search_turfs(q, page=1, per_page=12, city=''):
+    """Relevance-ranked, paginated turf search over name, city, address and description, within a city prefix."""
+    page = max(page, 1)
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    match = match_expression(q)
+    if not match:
+        return SearchPage([], q, page, per_page, False)
+
+    if db.engine.dialect.name == 'sqlite':
+        query = (
+            Turf.query.join(turf_fts, turf_fts.c.rowid == Turf.id)
+            .filter(literal_column('turf_fts').op('MATCH')(match), Turf.deleted_at.is_(None))
+            .order_by(func.bm25(literal_column('turf_fts'), *RANK_WEIGHTS), Turf.id)
+        )
+    else:
+        # Portable fallback for backends without FTS5.
+        words = re.findall(r'\w+', q)
+        query = Turf.query.filter(*[
+            or_(Turf.name.ilike(f'%{w}%'), Turf.city.ilike(f'%{w}%'),
+                Turf.address.ilike(f'%{w}%'), Turf.description.ilike(f'%{w}%'))
+            for w in words
+        ], Turf.deleted_at.is_(None)).order_by(Turf.id)
+
+    if city:
+        query = query.filter(city_prefix(city))
+    rows = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+    return SearchPage(rows[:per_page], q, page, per_page, len(rows) > per_page)
@@ -0,0 +1,129 @@
+import random
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from sqlalchemy import insert, text
+from werkzeug.security import generate_password_hash
+from . import db
+from .database import advance_id_sequence, next_free_id
+from .models import User, Turf, Slot, Booking
+
+SeedResult = namedtuple('SeedResult', 'users turfs slots bookings owner_id player_id turf_id date')
+
+CITY_CENTERS = {
+    'Pune': (18.5204, 73.8567), 'Mumbai': (19.0760, 72.8777), 'Bengaluru': (12.9716, 77.5946),
+    'Delhi': (28.6139, 77.2090), 'Hyderabad': (17.3850, 78.4867), 'Chennai': (13.0827, 80.2707),
+    'Kolkata': (22.5726, 88.3639), 'Ahmedabad': (23.0225, 72.5714),
+}
+CITIES = list(CITY_CENTERS)
+CITY_SPREAD = 0.2  # degrees around the centre, roughly ±20 km
+PRICES = [600.0, 800.0, 1000.0, 1200.0, 1500.0]
+SEED_PASSWORD = 'password'
+FIRST_HOUR, HOURS_PER_DAY = 6, 16  # hourly slots from 06:00 to 22:00
+
+# ---------------------------
+# SYNTHETIC DATA
+# ---------------------------
+# Rows are generated lazily and written with executemany batches of plain
+# Core inserts, so millions of slots never sit in memory at once. Slot ids
+# are assigned up front, which lets bookings be drawn in the same pass:
+# selection sampling picks exactly `bookings` of the slots without a second
+# query. Explicit ids leave PostgreSQL's sequences behind, so they are
+# moved past the seeded rows before committing. Half of each turf's slots
+# lie in the past, half in the future, so booking history and availability
+# both have data. Every seeded user can log in with SEED_PASSWORD.
+
+def _insert_batches(model, rows, batch):
+    while True:
+        chunk = list(islice(rows, batch))
+        if not chunk:
+            return
+        db.session.execute(insert(model), chunk)
+
+def _locate(row, rng):
+    lat, lng = CITY_CENTERS[row['city']]
+    row.update(latitude=round(lat + rng.uniform(-CITY_SPREAD, CITY_SPREAD), 6),
+               longitude=round(lng + rng.uniform(-CITY_SPREAD, CITY_SPREAD), 6))
+    return row
+
+def _next_id(model):
+    return next_free_id(db.session.connection(), model.__table__)
+
+def seed_database(users=2200, owners=200, turfs=2000, slots=60000, bookings=20000,
+                  batch=5000, seed=42, progress=None):
+    """Append a synthetic dataset of the given volumes; returns a SeedResult."""
+    if not 0 < owners < users:
+        raise ValueError('owners must be between 1 and users - 1')
+    if bookings > slots:
+        raise ValueError('cannot book more slots than are seeded')
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    report = progress or (lambda name, count: None)
+    password_hash = generate_password_hash(SEED_PASSWORD)
+
+    first_user = _next_id(User)
+    owner_ids = range(first_user, first_user + owners)
+    player_ids = range(first_user + owners, first_user + users)
+    _insert_batches(User, (
+        dict(id=uid, username=f'seed{uid}', email=f'seed{uid}@seed.local', password_hash=password_hash,
+             is_owner=uid in owner_ids, created_at=now)
+        for uid in range(first_user, first_user + users)
+    ), batch)
+    report('users', users)
+
+    first_turf = _next_id(Turf)
+    turf_ids = range(first_turf, first_turf + turfs)
+    geo_rng = random.Random(seed + 1)  # its own stream, so the other columns stay as before
+    _insert_batches(Turf, (
+        _locate(dict(id=tid, owner_id=rng.choice(owner_ids), name=f'Turf {tid}', city=rng.choice(CITIES),
+                     address=f'{tid} Main Road', price_per_hour=rng.choice(PRICES),
+                     description='Synthetic turf for load testing', created_at=now - timedelta(minutes=tid),
+                     updated_at=now), geo_rng)
+        for tid in turf_ids
+    ), batch)
+    report('turfs', turfs)
+
+    per_turf, extra = divmod(slots, turfs)
+    days_back = (per_turf // HOURS_PER_DAY) // 2
+    first_day = date.today() - timedelta(days=days_back)
+    first_slot = _next_id(Slot)
+    first_booking = _next_id(Booking)
+    booked = []  # (booking row) pending for the current batch of slots
+
+    def slot_rows():
+        slot_id, seen, picked = first_slot, 0, 0
+        for index, tid in enumerate(turf_ids):
+            for n in range(per_turf + (1 if index < extra else 0)):
+                # Selection sampling: book this slot with probability remaining/left.
+                is_booked = rng.random() * (slots - seen) < bookings - picked
+                seen += 1
+                if is_booked:
+                    booked.append(dict(id=first_booking + picked, user_id=rng.choice(player_ids),
+                                       turf_id=tid, slot_id=slot_id, status='confirmed',
+                                       created_at=now))
+                    picked += 1
+                day, hour = divmod(n, HOURS_PER_DAY)
+                yield dict(id=slot_id, turf_id=tid, date=first_day + timedelta(days=day),
+                           start_time=time(FIRST_HOUR + hour), end_time=time(FIRST_HOUR + hour + 1),
+                           is_booked=is_booked, created_at=now)
+                slot_id += 1
+
+    rows = slot_rows()
+    written = 0
+    while True:
+        chunk = list(islice(rows, batch))
+        if not chunk:
+            break
+        db.session.execute(insert(Slot), chunk)
+        if booked:
+            db.session.execute(insert(Booking), booked)
+            booked.clear()
+        written += len(chunk)
+        report('slots', written)
+    for model in (User, Turf, Slot, Booking):
+        advance_id_sequence(db.session.connection(), model.__table__)
+    db.session.commit()
+
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(text('ANALYZE'))
+    return SeedResult(users, turfs, slots, bookings, owner_ids[0], player_ids[0], turf_ids[0], date.today())
@@ -0,0 +1,205 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import date, datetime, time
+from itertools import groupby
+from flask import current_app
+from sqlalchemy import func
+from . import db, queries
+from .cache import LRUCache
+from .models import Turf, Slot
+
+MAX_PER_PAGE = 50
+
+FreeSlot = namedtuple('FreeSlot', 'id start_time end_time')
+TurfAvailability = namedtuple('TurfAvailability', 'turf slots')
+AvailabilityPage = namedtuple('AvailabilityPage', 'results day page per_page has_next')
+
+# ---------------------------
+# AVAILABILITY SEARCH
+# ---------------------------
+# "Which turf in <city> has a free slot on <day> between <start> and <end>
+# under <price>/hr?" A slot matches when it is free, has not started yet and
+# lies entirely inside the window. Turfs are ranked cheapest first, then by
+# how many matching slots they have, and paginated.
+#
+# The SQL path walks the city's turfs (NOCASE city index) and seeks each
+# one's slots for the day through ix_slot_turf_date_start, grouped per turf
+# in one query; a second query fetches the page's slots.
+
+def slot_filters(day, start, end, now=None):
+    now = now or datetime.now()
+    filters = [Slot.date == day, Slot.is_booked.is_(False), Slot.start_time >= start, Slot.end_time <= end]
+    if day == now.date():
+        filters.append(Slot.start_time > now.time())
+    return filters
+
+def available_turfs_query(city, day, start=time.min, end=time.max, max_price=None):
+    """Turfs with matching free slots, with their count, ranked; one row per turf."""
+    free = func.count(Slot.id).label('free_slots')
+    query = (
+        (queries.turfs_by_city(city) if city else queries.all_turfs())
+        .join(Slot, Slot.turf_id == Turf.id)
+        .filter(*slot_filters(day, start, end))
+        .add_columns(free)
+        .group_by(Turf.id)
+        .order_by(Turf.price_per_hour, free.desc(), Turf.id)
+    )
+    if max_price is not None:
+        query = query.filter(Turf.price_per_hour <= max_price)
+    return query
+
+def _search_sql(city, day, start, end, max_price, page, per_page):
+    rows = (available_turfs_query(city, day, start, end, max_price)
+            .offset((page - 1) * per_page).limit(per_page + 1).all())
+    turfs = [turf for turf, _ in rows[:per_page]]
+    slots = {}
+    if turfs:
+        free = (
+            db.session.query(Slot.turf_id, Slot.id, Slot.start_time, Slot.end_time)
+            .filter(Slot.turf_id.in_([t.id for t in turfs]), *slot_filters(day, start, end))
+            .order_by(Slot.turf_id, Slot.start_time)
+        )
+        for turf_id, group in groupby(free, key=lambda row: row.turf_id):
+            slots[turf_id] = [FreeSlot(row.id, row.start_time, row.end_time) for row in group]
+    return turfs, slots, len(rows) > per_page
+
+# ---------------------------
+# IN-MEMORY AVAILABILITY INDEX
+# ---------------------------
+# Optional (AVAILABILITY_INDEX_ENABLED). One entry per (city, day) holds
+# every live turf of the city with its free slots that day, sorted by start
+# time and grouped by price. A search walks the price groups cheapest first
+# (stopping at max_price, or once the requested page is filled) with a
+# bisect per turf, so it touches only the turfs that can rank. Entries are
+# built by one query on first use and kept up to date incrementally:
+# invalidate_turf() marks the turf dirty in every entry, and the next
+# search of an entry re-reads only its dirty turfs. Like the page cache it
+# is per process, so the TTL bounds how stale another worker's entry can
+# get; a stale slot just fails to book.
+
+class _DayEntry:
+    """Free slots of one city's turfs on one day: turf id -> (price, starts, slots), plus price -> turf ids."""
+
+    def __init__(self):
+        self.turfs = {}
+        self.by_price = {}
+        self.dirty = set()
+        self.lock = threading.Lock()
+
+    def _drop(self, turf_id):
+        price = self.turfs.pop(turf_id, (None,))[0]
+        group = self.by_price.get(price)
+        if group is not None:
+            group.discard(turf_id)
+            if not group:
+                del self.by_price[price]
+
+    def load(self, city, day, turf_ids=None):
+        query = (
+            (queries.turfs_by_city(city) if city else queries.all_turfs())
+            .join(Slot, Slot.turf_id == Turf.id)
+            .filter(Slot.date == day, Slot.is_booked.is_(False))
+            .with_entities(Turf.id, Turf.price_per_hour, Slot.id, Slot.start_time, Slot.end_time)
+            .order_by(Turf.id, Slot.start_time)
+        )
+        if turf_ids is not None:
+            query = query.filter(Turf.id.in_(turf_ids))
+            for turf_id in turf_ids:
+                self._drop(turf_id)
+        for turf_id, group in groupby(query, key=lambda row: row[0]):
+            group = list(group)
+            price = group[0][1]
+            slots = [FreeSlot(slot_id, start, end) for _, _, slot_id, start, end in group]
+            self.turfs[turf_id] = (price, [s.start_time for s in slots], slots)
+            self.by_price.setdefault(price, set()).add(turf_id)
+
+class AvailabilityIndex:
+    def __init__(self, max_entries=64, ttl=60):
+        self.entries = LRUCache(max_entries=max_entries, ttl=ttl)
+
+    def mark_dirty(self, turf_id):
+        for entry in self.entries.values():
+            with entry.lock:
+                entry.dirty.add(turf_id)
+
+    def clear(self):
+        self.entries.clear()
+
+    def entry(self, city, day):
+        key = (city.casefold(), day)
+        entry = self.entries.get(key)
+        if entry is None:
+            # Cached before loading, under its lock: changes made meanwhile mark it dirty.
+            # A failed load must not leave a half-filled entry cached.
+            entry = _DayEntry()
+            with entry.lock:
+                self.entries.set(key, entry)
+                try:
+                    entry.load(city, day)
+                except Exception:
+                    self.entries.delete(key)
+                    raise
+        elif entry.dirty:
+            with entry.lock:
+                dirty, entry.dirty = entry.dirty, set()
+                if dirty:
+                    try:
+                        entry.load(city, day, dirty)
+                    except Exception:
+                        entry.dirty |= dirty
+                        raise
+        return entry
+
+    def search(self, city, day, start, end, max_price, limit, now=None):
+        """Ranked [(turf id, matching free slots)], at least `limit` long when there are that many."""
+        now = now or datetime.now()
+        started = now.time() if day == now.date() else None
+        entry = self.entry(city, day)
+        ranked = []
+        with entry.lock:
+            for price in sorted(entry.by_price):
+                if (max_price is not None and price > max_price) or len(ranked) >= limit:
+                    break
+                group = []
+                for turf_id in entry.by_price[price]:
+                    _, starts, slots = entry.turfs[turf_id]
+                    found = [s for s in slots[bisect_left(starts, start):bisect_right(starts, end)]
+                             if s.end_time <= end and (started is None or s.start_time > started)]
+                    if found:
+                        group.append((-len(found), turf_id, found))
+                group.sort(key=lambda match: match[:2])
+                ranked.extend((turf_id, found) for _, turf_id, found in group)
+        return ranked
+
+availability_index = AvailabilityIndex()
+
+def init_availability_index(app):
+    availability_index.entries.ttl = app.config.get('AVAILABILITY_INDEX_TTL', 60)
+    availability_index.entries.max_entries = app.config.get('AVAILABILITY_INDEX_MAX_ENTRIES', 64)
+
+def _search_index(city, day, start, end, max_price, page, per_page):
+    ranked = availability_index.search(city, day, start, end, max_price, limit=page * per_page + 1)
+    window = ranked[(page - 1) * per_page:page * per_page]
+    turfs = []
+    if window:
+        by_id = {t.id: t for t in Turf.query.filter(Turf.id.in_([turf_id for turf_id, _ in window]))}
+        turfs = [by_id[turf_id] for turf_id, _ in window if turf_id in by_id]
+    return turfs, dict(window), len(ranked) > page * per_page
+
+# ---------------------------
+# SEARCH
+# ---------------------------
+def find_available(city='', day=None, start=None, end=None, max_price=None, page=1, per_page=12,
+                   use_index=None):
+    """Ranked, paginated turfs with free slots matching the filters; returns an AvailabilityPage."""
+    day = max(day or date.today(), date.today())
+    start, end = start or time.min, end or time.max
+    page = max(page, 1)
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    if use_index is None:
+        use_index = current_app.config.get('AVAILABILITY_INDEX_ENABLED', False)
+    search = _search_index if use_index else _search_sql
+    turfs, slots, has_next = search(city or '', day, start, end, max_price, page, per_page)
+    results = [TurfAvailability(turf, slots.get(turf.id, [])) for turf in turfs]
+    return AvailabilityPage(results, day, page, per_page, has_next)
@@ -0,0 +1,44 @@
+import atexit
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from flask import current_app
+
+# ---------------------------
+# BACKGROUND WORKER POOL
+# ---------------------------
+# A small per-process thread pool for work that must not run on the request
+# thread (image derivatives, batch cleanups). Jobs run inside an app context
+# of the app that submitted them. With TASKS_EAGER set (handy in tests and
+# benchmarks) jobs run inline and the returned future is already resolved.
+
+_executor = None
+_lock = threading.Lock()
+
+def _get_executor(max_workers):
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='turfease-task')
+            atexit.register(_executor.shutdown, wait=False)
+        return _executor
+
+def submit(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) on the worker pool inside an app context; returns a Future."""
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                app.logger.exception(f'Background task {fn.__name__} failed')
+                raise
+
+    if app.config.get('TASKS_EAGER'):
+        future = Future()
+        try:
+            future.set_result(run())
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return _get_executor(app.config.get('TASK_WORKERS', 2)).submit(run)